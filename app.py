@@ -2,11 +2,17 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import os
+import threading
+from data_watcher import DatasetWatcher, watch_interval
+from sector_queries import SectorQueries
+from data_loader import artifact_path, data_dir, load_artifact, limit_sunburst_leaves, sunburst, truncated_sunburst_parents, build_table_index, query_table
+from instrumentation import begin_run, end_run, profiling_enabled, recent_stages, stage
 
 # ==========================================
 # 1. إعداد الصفحة والتصميم (CSS)
 # ==========================================
 st.set_page_config(layout="wide", page_title="Dashboard Electricity", page_icon="⚡")
+begin_run()
 
 st.markdown("""
 <style>
@@ -94,124 +100,8 @@ st.markdown("""
 COLOR_MAP = {'كشك': '#2980b9', 'غرفة': '#c0392b', 'هوائي': '#8e44ad', 'مبنى': '#f1c40f'}
 
 # ==========================================
-# دالة توحيد أسماء القطاعات
+# 2. دوال مساعدة للواجهة
 # ==========================================
-def clean_sector_name(name):
-    if pd.isna(name): return "غير محدد"
-    s = str(name).strip()
-    s = s.replace('أ', 'ا').replace('ة', 'ه')
-    s = s.replace('قطاعى', '').replace('قطاع', '').strip()
-    s = ' '.join(s.split()) 
-    return f"قطاع {s}"
-
-# ==========================================
-# 2. دوال المعالجة والتحميل (Backend Logic)
-# ==========================================
-
-@st.cache_data
-def load_stations():
-    if os.path.exists('Electricity_Stations_Final_Cleaned.xlsx'):
-        df = pd.read_excel('Electricity_Stations_Final_Cleaned.xlsx')
-        df['القطاع'] = df['القطاع'].apply(clean_sector_name)
-        col_name = 'المحطة' if 'المحطة' in df.columns else df.columns[1]
-        df = df.dropna(subset=[col_name]) 
-        df = df[df[col_name].astype(str).str.len() > 1]
-        if 'ملاحظات' in df.columns: df['ملاحظات'] = df['ملاحظات'].fillna('لا توجد ملاحظات')
-        else: df['ملاحظات'] = 'غير متوفر'
-        df['العدد'] = 1
-        return df
-    return None
-
-@st.cache_data
-def load_distributors():
-    files = [f for f in os.listdir('.') if "517" in f and (f.endswith('.xlsx') or f.endswith('.csv'))]
-    if not files: return None, None
-    path = files[0]
-    try:
-        if path.endswith('.csv'): df = pd.read_csv(path).iloc[:, [1, 2, 3, 4]]
-        else: df = pd.read_excel(path).iloc[:, [1, 2, 3, 4]]
-        df.columns = ['القطاع', 'الهندسة', 'مسلسل', 'الموزع']
-        df = df.replace('nan', pd.NA).ffill()
-        df = df[pd.to_numeric(df['مسلسل'], errors='coerce').notnull()]
-        df['القطاع'] = df['القطاع'].apply(clean_sector_name)
-        df['الهندسة'] = df['الهندسة'].astype(str).str.strip()
-        eng_counts = df.groupby('القطاع')['الهندسة'].nunique()
-        df['قطاع_للرسم'] = df['القطاع'].apply(lambda x: f"{x} (هندسات: {eng_counts.get(x, 0)})")
-        df['عدد_الموزعات'] = 1
-        summary = df.groupby('القطاع').agg({'الهندسة': 'nunique', 'الموزع': 'count'}).reset_index()
-        summary.columns = ['القطاع', 'عدد الهندسات', 'عدد الموزعات']
-        return df, summary
-    except Exception as e: return None, None
-
-def strict_classify_multi(row, type_cols, col_name):
-    combined_type_text = ""
-    if type_cols:
-        for col in type_cols:
-            val = str(row[col])
-            if pd.notna(val) and val.strip() != 'nan': combined_type_text += val + " "
-    type_clean = combined_type_text.strip().replace('أ', 'ا').replace('ة', 'ه')
-    name_val = str(row[col_name]).strip() if col_name and pd.notna(row[col_name]) else ''
-    name_clean = name_val.replace('أ', 'ا').replace('ة', 'ه')
-    if 'غرف' in type_clean: return 'غرفة'
-    if 'كشك' in type_clean: return 'كشك'
-    if 'هواي' in type_clean or 'علق' in type_clean: return 'هوائي'
-    if 'غرف' in name_clean: return 'غرفة'
-    return 'كشك'
-
-def process_file_final(file_path, filename):
-    try:
-        df_temp = pd.read_excel(file_path, header=None)
-        start_row = 0
-        found_header = False
-        for idx, row in df_temp.head(50).iterrows():
-            row_str = " ".join(row.astype(str).values)
-            if ('اسم' in row_str and 'محول' in row_str) or ('كشك' in row_str and 'غرفة' in row_str) or ('قدرة' in row_str):
-                start_row = idx
-                found_header = True
-                break
-        if not found_header: return None
-        df = pd.read_excel(file_path, header=start_row)
-        df.columns = df.columns.astype(str).str.strip()
-        col_name = next((c for c in df.columns if 'اسم' in c or 'محول' in c or 'بيان' in c), None)
-        type_cols = [c for c in df.columns if 'نوع' in c or 'كشك' in c or 'غرف' in c]
-        col_cap  = next((c for c in df.columns if 'قدرة' in c or 'kva' in c.lower()), None)
-        if col_name:
-            df_clean = df.dropna(subset=[col_name]).copy()
-            df_clean = df_clean[~df_clean[col_name].astype(str).str.contains('total|اجمالي|عدد', case=False, na=False)]
-            df_clean = df_clean[df_clean[col_name].astype(str).str.len() > 1]
-            df_clean['النوع_النهائي'] = df_clean.apply(lambda x: strict_classify_multi(x, type_cols, col_name), axis=1)
-            if col_cap:
-                df_clean['القدرة_النهائية'] = pd.to_numeric(df_clean[col_cap].astype(str).str.replace(',', '').str.replace(' ', ''), errors='coerce').fillna(0)
-            else: df_clean['القدرة_النهائية'] = 0.0
-            
-            fname_clean = filename.replace('أ', 'ا').replace('ة', 'ه').lower()
-            if 'زايد' in fname_clean: dist = 'الشيخ زايد'
-            elif ('اول' in fname_clean or '1' in fname_clean) and 'ثان' not in fname_clean: dist = 'إسماعيلية أول'
-            elif 'ثان' in fname_clean or '2' in fname_clean or 'تاني' in fname_clean: dist = 'إسماعيلية ثان'
-            else: dist = 'غير محدد' 
-            owner = 'ملك الشركة' if 'شركه' in fname_clean else ('ملك الغير' if 'غير' in fname_clean else 'غير محدد')
-
-            return pd.DataFrame({
-                'الهندسة': dist, 'الملكية': owner, 'اسم المحول': df_clean[col_name],
-                'النوع': df_clean['النوع_النهائي'], 'القدرة': df_clean['القدرة_النهائية'],
-                'القطاع': 'قطاع شمال الاسماعيليه' 
-            })
-        return None
-    except: return None
-
-def load_all_north_data():
-    all_dfs = []
-    excluded = ['Electricity_Stations_Final_Cleaned.xlsx', 'requirements.txt', 'app.py', '.git']
-    files = [f for f in os.listdir('.') if f.endswith(('.xls', '.xlsx')) and f not in excluded and "517" not in f and not f.startswith('~$')]
-    for f in files:
-        res = process_file_final(f, f)
-        if res is not None: all_dfs.append(res)
-    if all_dfs: 
-        df_final = pd.concat(all_dfs, ignore_index=True)
-        df_final['القطاع'] = df_final['القطاع'].apply(clean_sector_name)
-        return df_final
-    return pd.DataFrame()
-
 def metric_card(title, value, subtitle="", style_class=""):
     st.markdown(f"""
     <div class="metric-card {style_class}">
@@ -221,15 +111,122 @@ def metric_card(title, value, subtitle="", style_class=""):
     </div>
     """, unsafe_allow_html=True)
 
+# مدخل واحد فقط: إعادة بناء الملف الجاهز (mtime_ns جديد) تستبدل البيانات السابقة في الذاكرة بدلاً من تكديسها
+@st.cache_resource(max_entries=1)
+def load_prebuilt_dataset(path, mtime_ns):
+    return load_artifact(path)
+
+@st.cache_resource(max_entries=64, show_spinner=False)
+def cached_figure(version, name, selection, _build):
+    # الرسم يُبنى مرة واحدة لكل (إصدار البيانات، اسم الرسم، الاختيار) ثم يُعاد نفس الكائن
+    return _build()
+
+def show_figure(name, build, selection=None):
+    with stage(f"figure:{name}", cache='hit') as record:
+        def build_and_record():
+            record['cache'] = 'miss'
+            return build()
+        fig = cached_figure(data['version'], name, selection, build_and_record)
+    # تحويل الرسم إلى JSON وإرساله للمتصفح
+    with stage(f"chart:{name}"): st.plotly_chart(fig, use_container_width=True)
+
+@st.cache_resource(max_entries=16, show_spinner=False)
+def cached_drill_parents(version, name, selection, path, _df):
+    return truncated_sunburst_parents(_df, list(path))
+
+def drill_down_select(label, parents, key):
+    # الآباء الذين جُمعت بعض عناصرهم في «أخرى» فقط؛ اختيار أحدهم يعرض كل عناصره
+    if parents.empty: return None
+    options = [None] + list(parents)
+    return st.selectbox(label, options, key=key,
+                        format_func=lambda p: "أكبر العناصر فقط" if p is None else " / ".join(map(str, p if isinstance(p, tuple) else (p,))))
+
+def lod_sunburst(df, path, values=None, extra_cols=(), expand=None, **kwargs):
+    df_lod, value_col = limit_sunburst_leaves(df, path, values, extra_cols=extra_cols, expand=expand)
+    return sunburst(df_lod, path=path, values=value_col, **kwargs)
+
+@st.cache_resource(max_entries=16, show_spinner=False)
+def cached_table_index(version, name, search_cols, _df, _build=build_table_index):
+    return _build(_df, search_cols)
+
+def paged_table(name, df, search_cols, mask=None, page_sizes=(25, 50, 100, 500)):
+    # جدول مع بحث وترتيب وتقسيم صفحات على الخادم: لا يُرسل للمتصفح إلا الصفحة المعروضة
+    with stage(f"table_index:{name}", rows=len(df), cache='hit') as record:
+        def build_and_record(df, search_cols):
+            record['cache'] = 'miss'
+            return build_table_index(df, search_cols)
+        index = cached_table_index(data['version'], name, tuple(search_cols), df, build_and_record)
+    f1, f2, f3, f4 = st.columns([3, 2, 1, 1])
+    with f1: search = st.text_input(f"🔍 بحث ({' / '.join(search_cols)})", key=f"{name}_search")
+    with f2: sort_col = st.selectbox("ترتيب حسب", [None] + list(df.columns), key=f"{name}_sort", format_func=lambda c: "بدون" if c is None else str(c))
+    with f3: ascending = st.selectbox("الاتجاه", [True, False], key=f"{name}_asc", format_func=lambda a: "تصاعدي" if a else "تنازلي")
+    with f4: page_size = st.selectbox("عدد الصفوف", page_sizes, key=f"{name}_size")
+    with stage(f"table_query:{name}") as record:
+        rows = query_table(df, index, mask, search, sort_col, ascending)
+        record['rows'] = len(rows)
+    pages = max(1, -(-len(rows) // page_size))
+    page = st.number_input("الصفحة", min_value=1, max_value=pages, value=1, step=1, key=f"{name}_page") if pages > 1 else 1
+    start = (min(page, pages) - 1) * page_size
+    st.dataframe(df.iloc[rows[start:start + page_size]], use_container_width=True)
+    st.caption(f"عرض {min(start + 1, len(rows))}–{min(start + page_size, len(rows))} من {len(rows)} صف")
+
+@st.cache_resource(max_entries=2)
+def sector_queries(version, _dataset):
+    return SectorQueries(_dataset)
+
+@st.cache_resource
+def data_watcher():
+    # خيط واحد لكل الخادم يراقب مجلد البيانات ويحدّثها في الخلفية
+    return DatasetWatcher(data_dir()).start()
+
+def get_dataset():
+    # الملف الجاهز من precompute.py إن وُجد، وإلا آخر إصدار حمّله مراقب مجلد البيانات
+    path = artifact_path()
+    if os.path.exists(path): return load_prebuilt_dataset(path, os.stat(path).st_mtime_ns)
+    return data_watcher().current()
+
+def is_admin():
+    # لوحة القياس تظهر فقط مع تفعيل DASHBOARD_PROFILE وفتح الرابط بـ ?admin=<DASHBOARD_ADMIN_TOKEN>
+    token = os.environ.get('DASHBOARD_ADMIN_TOKEN')
+    return profiling_enabled() and bool(token) and st.query_params.get('admin') == token
+
+def stage_table(records):
+    columns = ['stage', 'seconds', 'rows', 'cache', 'peak_mb', 'thread', 'time']
+    # ترتيب حسب وقت البدء: المرحلة الأب قبل المراحل داخلها
+    records = sorted(records, key=lambda r: (r['time'], r['depth']))
+    df = pd.DataFrame(records, columns=columns)
+    # المراحل المتداخلة تُزاح بمسافات حسب عمقها
+    if records: df['stage'] = ['\u2003' * r['depth'] + r['stage'] for r in records]
+    return df
+
+def profiling_panel(records):
+    with st.sidebar.expander("⏱️ قياس زمن المراحل", expanded=True):
+        total = sum(r['seconds'] for r in records if r['depth'] == 0)
+        st.caption(f"إعادة التشغيل الحالية: {total:.3f} ث ({len(records)} مرحلة)")
+        st.dataframe(stage_table(records), use_container_width=True, hide_index=True)
+        # مراحل خيوط أخرى (تحميل البيانات في الخلفية) من آخر السجلات
+        current = threading.current_thread().name
+        background = [r for r in recent_stages() if r['thread'] != current]
+        if background:
+            st.caption("آخر مراحل التحميل في الخلفية")
+            st.dataframe(stage_table(background[:50]), use_container_width=True, hide_index=True)
+
+@st.fragment(run_every=watch_interval())
+def reload_on_new_data(version):
+    # يعيد تشغيل الصفحة تلقائياً عند ظهور إصدار بيانات جديد
+    if get_dataset()['version'] != version: st.rerun(scope='app')
+
 # ==========================================
 # 3. واجهة التطبيق (الرئيسية)
 # ==========================================
 
 st.title("⚡ منظومة إدارة الكهرباء - Dashboard")
 
-df_st = load_stations()
-df_dst, df_dst_summ = load_distributors()
-df_nth = load_all_north_data()
+with stage('dataset'): data = get_dataset()
+reload_on_new_data(data['version'])
+df_st, df_dst, df_dst_summ, df_nth = data['stations'], data['distributors'], data['distributors_summary'], data['north']
+aggregates = data['aggregates']
+north_cube, dist_cube = aggregates['north_cube'], aggregates['dist_cube']
 
 # ----------------- تعديل الترتيب هنا -----------------
 tab_home, tab_sector_details, tab_stations, tab_dist, tab_north = st.tabs([
@@ -238,22 +235,17 @@ tab_home, tab_sector_details, tab_stations, tab_dist, tab_north = st.tabs([
     "🏭 المحطات العامة",
     "🔌 الموزعات (517)", 
     "🗺️ قطاع شمال الإسماعيلية"
-])
+], key='active_tab', on_change='rerun')
 
 # -----------------------------------------------------------------------------
 # TAB 1: الصفحة الرئيسية (الملخص)
 # -----------------------------------------------------------------------------
-with tab_home:
+def render_home_tab():
     st.markdown("### 📊 ملخص بيانات الشركة")
-    all_sectors_unique = set()
-    if df_st is not None: all_sectors_unique.update(df_st['القطاع'].unique())
-    if df_dst is not None: all_sectors_unique.update(df_dst['القطاع'].unique())
-    
-    clean_sectors = [s for s in all_sectors_unique if s != "غير محدد" and str(s) != 'nan' and "شمال - جنوب" not in s]
-    count_sectors = len(clean_sectors)
+    count_sectors = len(aggregates['sectors'])
     count_st = len(df_st) if df_st is not None else 0
     count_dst = len(df_dst) if df_dst is not None else 0
-    count_nth = len(df_nth) if not df_nth.empty else 0
+    count_nth = int(north_cube['العدد'].sum())
     
     c1, c2, c3, c4 = st.columns(4)
     with c1: metric_card("عدد القطاعات", count_sectors, "قطاع جغرافي")
@@ -264,64 +256,62 @@ with tab_home:
     st.markdown("---")
     if not df_nth.empty:
         st.markdown("### 🧬 تفاصيل محولات قطاع الشمال")
-        df_co = df_nth[df_nth['الملكية'] == 'ملك الشركة']
-        df_pr = df_nth[df_nth['الملكية'] == 'ملك الغير']
+        owner_type = north_cube.groupby(['الملكية', 'النوع'], observed=True)['العدد'].sum()
+        count_of = lambda owner, kind: int(owner_type.get((owner, kind), 0))
         col_co, col_pr = st.columns(2)
         with col_co:
             st.info("🏢 **ملك الشركة**")
             k1, k2, k3 = st.columns(3)
-            with k1: metric_card("أكشاك", len(df_co[df_co['النوع']=='كشك']), style_class="card-company")
-            with k2: metric_card("غرف", len(df_co[df_co['النوع']=='غرفة']), style_class="card-company")
-            with k3: metric_card("هوائي", len(df_co[df_co['النوع']=='هوائي']), style_class="card-company")
+            with k1: metric_card("أكشاك", count_of('ملك الشركة', 'كشك'), style_class="card-company")
+            with k2: metric_card("غرف", count_of('ملك الشركة', 'غرفة'), style_class="card-company")
+            with k3: metric_card("هوائي", count_of('ملك الشركة', 'هوائي'), style_class="card-company")
         with col_pr:
             st.warning("👤 **ملك الغير**")
             p1, p2, p3 = st.columns(3)
-            with p1: metric_card("أكشاك", len(df_pr[df_pr['النوع']=='كشك']), style_class="card-private")
-            with p2: metric_card("غرف", len(df_pr[df_pr['النوع']=='غرفة']), style_class="card-private")
-            with p3: metric_card("هوائي", len(df_pr[df_pr['النوع']=='هوائي']), style_class="card-private")
+            with p1: metric_card("أكشاك", count_of('ملك الغير', 'كشك'), style_class="card-private")
+            with p2: metric_card("غرف", count_of('ملك الغير', 'غرفة'), style_class="card-private")
+            with p3: metric_card("هوائي", count_of('ملك الغير', 'هوائي'), style_class="card-private")
 
     st.markdown("---")
     st.markdown("### 📈 الرسوم التوضيحية المجمعة")
     row3_c1, row3_c2, row3_c3 = st.columns(3)
     with row3_c1:
         if df_st is not None:
-            st.plotly_chart(px.sunburst(df_st, path=['القطاع', 'المحطة'], title="توزيع المحطات العامة"), use_container_width=True)
+            show_figure('home_stations', lambda: sunburst(df_st, path=['القطاع', 'المحطة'], title="توزيع المحطات العامة"))
     with row3_c2:
         if df_dst is not None:
-            st.plotly_chart(px.sunburst(df_dst, path=['قطاع_للرسم', 'الهندسة'], title="توزيع الموزعات"), use_container_width=True)
+            show_figure('home_distributors', lambda: sunburst(dist_cube, path=['قطاع_للرسم', 'الهندسة'], values='العدد', title="توزيع الموزعات"))
     with row3_c3:
         if not df_nth.empty:
-            st.plotly_chart(px.sunburst(df_nth, path=['الملكية', 'النوع'], title="توزيع محولات الشمال", color='النوع', color_discrete_map=COLOR_MAP), use_container_width=True)
+            show_figure('home_north', lambda: sunburst(north_cube, path=['الملكية', 'النوع'], values='العدد', title="توزيع محولات الشمال", color='النوع', color_discrete_map=COLOR_MAP))
 
     st.markdown("#### مقارنة حجم البيانات")
     data_counts = {'الفئة': ['محطات عامة', 'موزعات', 'محولات الشمال'], 'العدد': [count_st, count_dst, count_nth]}
-    fig_bar_summ = px.bar(data_counts, x='الفئة', y='العدد', color='الفئة', text='العدد', title="مقارنة أعداد الأصول")
-    fig_bar_summ.update_traces(textposition='outside')
-    st.plotly_chart(fig_bar_summ, use_container_width=True)
+    def build_bar_summ():
+        fig_bar_summ = px.bar(data_counts, x='الفئة', y='العدد', color='الفئة', text='العدد', title="مقارنة أعداد الأصول")
+        fig_bar_summ.update_traces(textposition='outside')
+        return fig_bar_summ
+    show_figure('home_bar', build_bar_summ)
 
 # -----------------------------------------------------------------------------
 # TAB 2: تفاصيل القطاعات
 # -----------------------------------------------------------------------------
-with tab_sector_details:
+def render_sector_details_tab():
     st.markdown("### 🏢 استعلام تفصيلي بالقطاع")
     
-    all_available_sectors = set()
-    if df_st is not None: all_available_sectors.update(df_st['القطاع'].unique())
-    if df_dst is not None: all_available_sectors.update(df_dst['القطاع'].unique())
-    clean_list = sorted([s for s in all_available_sectors if s != "غير محدد" and str(s) != 'nan' and "شمال - جنوب" not in s])
-    
-    selected_sector = st.selectbox("📌 اختر القطاع لعرض تفاصيله:", clean_list)
+    selected_sector = st.selectbox("📌 اختر القطاع لعرض تفاصيله:", aggregates['sectors'])
     
     if selected_sector:
         st.markdown(f"#### 📊 إحصائيات: {selected_sector}")
         
-        sec_st = df_st[df_st['القطاع'] == selected_sector] if df_st is not None else pd.DataFrame()
-        sec_dst = df_dst[df_dst['القطاع'] == selected_sector] if df_dst is not None else pd.DataFrame()
-        sec_nth = df_nth[df_nth['القطاع'] == selected_sector] if not df_nth.empty else pd.DataFrame()
+        with stage('sector_queries'):
+            queries = sector_queries(data['version'], data)
+            dist_per_eng = queries.distributors_per_engineering(selected_sector)
+            pivot_table = queries.transformer_pivot(selected_sector)
+            num_stations = queries.station_count(selected_sector)
         
-        num_stations = len(sec_st)
-        num_eng = sec_dst['الهندسة'].nunique() if not sec_dst.empty else 0
-        num_dist = len(sec_dst)
+        num_eng = len(dist_per_eng)
+        num_dist = int(dist_per_eng['عدد الموزعات'].sum())
         
         col_s1, col_s2, col_s3 = st.columns(3)
         with col_s1: metric_card("المحطات العامة", num_stations, "محطة بالقطاع")
@@ -334,22 +324,14 @@ with tab_sector_details:
         
         with col_view1:
             st.markdown("<div class='table-header'>🔌 عدد الموزعات لكل هندسة</div>", unsafe_allow_html=True)
-            if not sec_dst.empty:
-                dist_per_eng = sec_dst.groupby('الهندسة').size().reset_index(name='عدد الموزعات')
+            if not dist_per_eng.empty:
                 st.table(dist_per_eng.set_index('الهندسة'))
             else:
                 st.info("لا توجد بيانات موزعات مسجلة لهذا القطاع.")
                 
         with col_view2:
             st.markdown("<div class='table-header'>⚡ تفاصيل المحولات (الشركة / الغير)</div>", unsafe_allow_html=True)
-            if not sec_nth.empty:
-                trans_grouped = sec_nth.groupby(['الهندسة', 'الملكية', 'النوع']).size().reset_index(name='العدد')
-                pivot_table = trans_grouped.pivot_table(
-                    index='الهندسة', 
-                    columns=['الملكية', 'النوع'], 
-                    values='العدد', 
-                    fill_value=0
-                ).astype(int)
+            if not pivot_table.empty:
                 st.dataframe(pivot_table, use_container_width=True, height=350)
             else:
                 st.info("ℹ️ لا توجد بيانات محولات مسجلة لهذا القطاع في الملفات الحالية.")
@@ -358,19 +340,15 @@ with tab_sector_details:
 # -----------------------------------------------------------------------------
 # TAB 3: المحطات العامة
 # -----------------------------------------------------------------------------
-with tab_stations:
+def render_stations_tab():
     if df_st is not None:
         st.subheader("المحطات العامة")
         cs1, cs2 = st.columns([3, 1])
         with cs1:
-            fig_s_sun = px.sunburst(df_st, path=['القطاع', 'المحطة'], values='العدد', height=700, hover_data=['ملاحظات'])
-            st.plotly_chart(fig_s_sun, use_container_width=True)
+            show_figure('stations_sunburst', lambda: sunburst(df_st, path=['القطاع', 'المحطة'], values='العدد', height=700, hover_data=['ملاحظات']))
         with cs2:
-            cnt_sec = df_st['القطاع'].value_counts().reset_index()
-            cnt_sec.columns = ['القطاع', 'العدد']
-            fig_s_bar = px.bar(cnt_sec, x='القطاع', y='العدد', color='القطاع', text='العدد')
-            st.plotly_chart(fig_s_bar, use_container_width=True)
-        st.dataframe(df_st)
+            show_figure('stations_bar', lambda: px.bar(aggregates['stations_per_sector'], x='القطاع', y='العدد', color='القطاع', text='العدد'))
+        paged_table('stations', df_st, ['المحطة', 'القطاع'])
     else:
         st.warning("ملف المحطات العامة غير موجود.")
 
@@ -378,7 +356,7 @@ with tab_stations:
 # -----------------------------------------------------------------------------
 # TAB 4: الموزعات
 # -----------------------------------------------------------------------------
-with tab_dist:
+def render_distributors_tab():
     if df_dst is not None:
         st.subheader("تحليل الموزعات (517)")
         
@@ -388,13 +366,15 @@ with tab_dist:
 
         cd1, cd2 = st.columns([1, 2])
         with cd1:
-            fig_d_sun = px.sunburst(df_dst, path=['قطاع_للرسم', 'الهندسة', 'الموزع'], color='القطاع', color_discrete_map=sector_colors_map, height=700)
-            st.plotly_chart(fig_d_sun, use_container_width=True)
+            expand_dst = drill_down_select("🔎 عرض كل موزعات هندسة:", cached_drill_parents(data['version'], 'distributors', None, ('قطاع_للرسم', 'الهندسة', 'الموزع'), df_dst), 'drill_dst')
+            show_figure('distributors_sunburst', lambda: lod_sunburst(df_dst, ['قطاع_للرسم', 'الهندسة', 'الموزع'], extra_cols=['القطاع'], expand=expand_dst, color='القطاع', color_discrete_map=sector_colors_map, height=700), expand_dst)
         with cd2:
-            cnt_dst = df_dst.groupby(['القطاع', 'الهندسة']).size().reset_index(name='العدد').sort_values('العدد', ascending=False)
-            fig_d_bar = px.bar(cnt_dst, x='الهندسة', y='العدد', color='القطاع', color_discrete_map=sector_colors_map, text='العدد', title="عدد الموزعات لكل هندسة")
-            fig_d_bar.update_layout(xaxis=dict(tickmode='linear', tickangle=-90))
-            st.plotly_chart(fig_d_bar, use_container_width=True)
+            def build_dist_bar():
+                cnt_dst = dist_cube.groupby(['القطاع', 'الهندسة'], observed=True)['العدد'].sum().reset_index().sort_values('العدد', ascending=False)
+                fig_d_bar = px.bar(cnt_dst, x='الهندسة', y='العدد', color='القطاع', color_discrete_map=sector_colors_map, text='العدد', title="عدد الموزعات لكل هندسة")
+                fig_d_bar.update_layout(xaxis=dict(tickmode='linear', tickangle=-90))
+                return fig_d_bar
+            show_figure('distributors_bar', build_dist_bar)
         st.dataframe(df_dst_summ, use_container_width=True)
     else:
         st.warning("ملف الموزعات (517) غير موجود.")
@@ -402,24 +382,39 @@ with tab_dist:
 # -----------------------------------------------------------------------------
 # TAB 5: شمال الإسماعيلية
 # -----------------------------------------------------------------------------
-with tab_north:
+def render_north_tab():
     if not df_nth.empty:
         st.subheader("تحليل تفصيلي - قطاع الشمال")
         all_eng = ['الكل'] + list(df_nth['الهندسة'].unique())
         selected_eng = st.selectbox("اختر الهندسة:", all_eng)
         df_view = df_nth if selected_eng == 'الكل' else df_nth[df_nth['الهندسة'] == selected_eng]
+        cube_view = north_cube if selected_eng == 'الكل' else north_cube[north_cube['الهندسة'] == selected_eng]
         
         col_n1, col_n2 = st.columns([2, 1])
         with col_n1:
-            fig_sun_n = px.sunburst(df_view, path=['الهندسة', 'الملكية', 'النوع', 'اسم المحول'], values='القدرة', color='النوع', color_discrete_map=COLOR_MAP, height=700)
-            st.plotly_chart(fig_sun_n, use_container_width=True)
+            expand_nth = drill_down_select("🔎 عرض كل محولات:", cached_drill_parents(data['version'], 'north', selected_eng, ('الهندسة', 'الملكية', 'النوع', 'اسم المحول'), df_view), 'drill_nth')
+            show_figure('north_sunburst', lambda: lod_sunburst(df_view, ['الهندسة', 'الملكية', 'النوع', 'اسم المحول'], 'القدرة', expand=expand_nth, color='النوع', color_discrete_map=COLOR_MAP, height=700), (selected_eng, expand_nth))
         with col_n2:
-            st.metric("إجمالي القدرة", f"{df_view['القدرة'].sum():,.1f} kVA")
-            st.metric("عدد المحولات", len(df_view))
-            cnt_type = df_view['النوع'].value_counts().reset_index()
-            cnt_type.columns = ['النوع', 'العدد']
-            fig_bar_n = px.bar(cnt_type, x='النوع', y='العدد', color='النوع', color_discrete_map=COLOR_MAP)
-            st.plotly_chart(fig_bar_n, use_container_width=True)
-        st.dataframe(df_view)
+            st.metric("إجمالي القدرة", f"{cube_view['القدرة'].sum():,.1f} kVA")
+            st.metric("عدد المحولات", int(cube_view['العدد'].sum()))
+            def build_type_bar():
+                cnt_type = cube_view.groupby('النوع', observed=True)['العدد'].sum().reset_index().sort_values('العدد', ascending=False)
+                return px.bar(cnt_type, x='النوع', y='العدد', color='النوع', color_discrete_map=COLOR_MAP)
+            show_figure('north_type_bar', build_type_bar, selected_eng)
+        paged_table('north', df_nth, ['اسم المحول'], mask=None if selected_eng == 'الكل' else (df_nth['الهندسة'] == selected_eng).to_numpy())
     else:
         st.warning("لا توجد بيانات لقطاع الشمال.")
+
+
+# -----------------------------------------------------------------------------
+# تنفيذ التبويب المفتوح فقط (باقي التبويبات لا تُبنى رسوماتها)
+# -----------------------------------------------------------------------------
+for tab, render in [(tab_home, render_home_tab), (tab_sector_details, render_sector_details_tab),
+                    (tab_stations, render_stations_tab), (tab_dist, render_distributors_tab), (tab_north, render_north_tab)]:
+    with tab:
+        if tab.open:
+            with stage(f"tab:{render.__name__.removeprefix('render_').removesuffix('_tab')}"): render()
+
+# سجل زمن إعادة التشغيل (عند تفعيل DASHBOARD_PROFILE) ولوحة المشرف
+run_stages = end_run(version=data['version'], tab=st.session_state.get('active_tab'))
+if is_admin(): profiling_panel(run_stages)
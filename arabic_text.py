@@ -0,0 +1,47 @@
+import pandas as pd
+import numpy as np
+from functools import lru_cache
+
+# ==========================================
+# توحيد النصوص العربية (مشترك بين كل دوال التحميل)
+# ==========================================
+# كل دالة هنا تعمل على القيم المختلفة فقط: تُوحَّد كل قيمة مرة واحدة ثم تُوزَّع النتيجة على الصفوف،
+# فتكلفة التوحيد تتناسب مع عدد القيم المختلفة وليس عدد الصفوف.
+# دوال القيم المفردة عليها lru_cache محدود فتبقى النتائج محفوظة بين مرات إعادة التحميل.
+
+def normalize_letters(text):
+    """توحيد الألف والتاء المربوطة: أ -> ا ، ة -> ه"""
+    return text.replace('أ', 'ا').replace('ة', 'ه')
+
+@lru_cache(maxsize=4096)
+def _clean_sector_text(s):
+    s = normalize_letters(s.strip())
+    s = s.replace('قطاعى', '').replace('قطاع', '').strip()
+    s = ' '.join(s.split())
+    return f"قطاع {s}"
+
+def clean_sector_name(name):
+    if pd.isna(name): return "غير محدد"
+    return _clean_sector_text(str(name))
+
+@lru_cache(maxsize=1024)
+def normalize_token(text):
+    """توحيد نص قصير (اسم ملف، هندسة، ملكية) للمقارنة: توحيد الحروف + أحرف صغيرة."""
+    return normalize_letters(text).lower()
+
+def map_unique(series, func):
+    """يطبق func على كل قيمة مختلفة مرة واحدة (والقيم الفارغة مرة واحدة) ويعيد Series بنفس الفهرس."""
+    codes, uniques = pd.factorize(series)
+    mapped = np.array([func(v) for v in uniques] + [func(np.nan)], dtype=object)
+    # الكود -1 (قيمة فارغة) يشير لآخر عنصر في mapped
+    return pd.Series(mapped[codes], index=series.index, name=series.name)
+
+def clean_sector_series(series):
+    return map_unique(series, clean_sector_name)
+
+def normalize_series(series):
+    """نص كل قيمة بعد strip وتوحيد الحروف؛ القيم الفارغة تصبح نصاً فارغاً."""
+    return map_unique(series, lambda v: '' if pd.isna(v) else normalize_letters(str(v).strip()))
+
+def normalize_search_series(series):
+    return map_unique(series, lambda v: '' if pd.isna(v) else normalize_letters(str(v).strip()).lower())
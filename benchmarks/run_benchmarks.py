@@ -0,0 +1,228 @@
+"""
+قياس أداء مراحل تحميل البيانات وبناء الرسوم على ملفات صناعية
+
+الاستخدام:
+    python benchmarks/run_benchmarks.py --rows 1000 10000 100000 --output bench.json
+    python benchmarks/run_benchmarks.py --rows 10000 --render --compare bench.json
+
+لكل حجم يُولَّد مجلد بيانات (synthetic_data.py) ثم تُقاس كل مرحلة على حدة:
+البحث عن صف العناوين، قراءة الورقة، التصنيف، التحميل الكامل (بارد / من اللقطات)، التجميع، بناء الرسوم،
+واختيارياً رسم كل تبويب عبر AppTest. النتيجة ملف JSON يمكن مقارنته بنتيجة إصدار سابق عبر --compare.
+"""
+import argparse
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pandas as pd
+import plotly.express as px
+import data_loader
+import synthetic_data
+
+TAB_LABELS = ["🏠 الرئيسية (Dashboard)", "🔍 تفاصيل القطاعات", "🏭 المحطات العامة", "🔌 الموزعات (517)", "🗺️ قطاع شمال الإسماعيلية"]
+
+
+def timed(func, repeat=1, setup=None):
+    """يشغل func عدد repeat مرات ويعيد (أقل زمن بالثواني، ناتج آخر تشغيل)."""
+    best, result = None, None
+    for _ in range(repeat):
+        if setup is not None: setup()
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def find_headers(paths):
+    found = 0
+    for path in paths:
+        rows = data_loader.iter_sheet_rows(path)
+        found += data_loader.read_sheet_header(rows) is not None
+        rows.close()
+    return found
+
+
+def parse_sheets(paths):
+    """يقرأ كل ملف على دفعات (كما في process_file_final) ويعيد الدفعات في جدول واحد لكل ملف."""
+    frames = []
+    for path in paths:
+        rows = data_loader.iter_sheet_rows(path)
+        columns = data_loader.read_sheet_header(rows)
+        if columns is not None:
+            columns = columns.astype(str).str.strip()
+            frames.append(pd.concat(data_loader.iter_sheet_chunks(rows, columns), ignore_index=True))
+        rows.close()
+    return frames
+
+
+def classify_frames(frames):
+    rows = 0
+    for df in frames:
+        col_name, type_cols, _ = data_loader.transformer_columns(df.columns)
+        rows += len(data_loader.classify_transformer_types(df, type_cols, col_name))
+    return rows
+
+
+def build_figures(dataset):
+    """يبني رسوم التبويبات الثقيلة ويحولها إلى JSON (ما يُرسل للمتصفح)؛ يعيد حجم JSON بالبايت."""
+    agg = dataset['aggregates']
+    figures = []
+    if dataset['stations'] is not None:
+        figures.append(data_loader.sunburst(dataset['stations'], ['القطاع', 'المحطة'], values='العدد'))
+        figures.append(px.bar(agg['stations_per_sector'], x='القطاع', y='العدد'))
+    if dataset['distributors'] is not None:
+        df_lod, value_col = data_loader.limit_sunburst_leaves(dataset['distributors'], ['قطاع_للرسم', 'الهندسة', 'الموزع'], extra_cols=['القطاع'])
+        figures.append(data_loader.sunburst(df_lod, ['قطاع_للرسم', 'الهندسة', 'الموزع'], values=value_col, color='القطاع'))
+    if dataset['north'] is not None and not dataset['north'].empty:
+        df_lod, value_col = data_loader.limit_sunburst_leaves(dataset['north'], ['الهندسة', 'الملكية', 'النوع', 'اسم المحول'], 'القدرة')
+        figures.append(data_loader.sunburst(df_lod, ['الهندسة', 'الملكية', 'النوع', 'اسم المحول'], values=value_col, color='النوع'))
+        figures.append(data_loader.sunburst(agg['north_cube'], ['الملكية', 'النوع'], values='العدد', color='النوع'))
+    return sum(len(fig.to_json()) for fig in figures)
+
+
+def render_tabs(repeat):
+    """زمن رسم كل تبويب عبر AppTest في عملية مستقلة لكل حجم: مخازن st.cache_resource في app.py
+    (ومنها مراقب مجلد البيانات) لا تعرف مجلد البيانات، فلو بقيت في نفس العملية لرسمت كل الأحجام بيانات الحجم الأول."""
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+        return pool.submit(_render_tabs, repeat).result()
+
+
+def _render_tabs(repeat):
+    from streamlit.testing.v1 import AppTest
+    # تشغيل أول يحمّل البيانات قبل القياس
+    at = AppTest.from_file(os.path.join(ROOT, 'app.py'), default_timeout=600).run()
+    results = {}
+    for label in TAB_LABELS:
+        def run():
+            at.session_state['active_tab'] = label
+            at.run()
+            if at.exception: raise RuntimeError(f"{label}: {at.exception[0].value}")
+        results[label], _ = timed(run, repeat)
+    return results
+
+
+def bench_size(rows, work_dir, repeat, render):
+    data_dir = os.path.join(work_dir, f"data_{rows}")
+    snapshots = os.path.join(work_dir, f"snapshot_{rows}")
+    os.environ['DASHBOARD_SNAPSHOT_DIR'] = snapshots
+    stages = {}
+
+    def record(name, seconds, processed):
+        stages[name] = {'seconds': round(seconds, 6), 'rows': processed,
+                        'rows_per_sec': round(processed / seconds, 1) if seconds > 0 else None}
+
+    seconds, paths = timed(lambda: synthetic_data.generate(data_dir, rows))
+    record('generate', seconds, rows)
+    north_paths = [os.path.join(data_dir, f) for f in data_loader.list_north_files(data_dir)]
+
+    seconds, found = timed(lambda: find_headers(north_paths), repeat)
+    record('header_detection', seconds, found)
+    seconds, frames = timed(lambda: parse_sheets(north_paths), repeat)
+    record('parse', seconds, sum(len(df) for df in frames))
+    seconds, classified = timed(lambda: classify_frames(frames), repeat)
+    record('classify', seconds, classified)
+    del frames
+
+    # تحميل بارد: بدون ذاكرة وبدون لقطات
+    def cold():
+        data_loader.clear_caches()
+        shutil.rmtree(snapshots, ignore_errors=True)
+    seconds, df_st = timed(lambda: data_loader.load_stations(data_dir), repeat, cold)
+    record('load_stations', seconds, len(df_st))
+    seconds, (df_dst, _) = timed(lambda: data_loader.load_distributors(data_dir), repeat, cold)
+    record('load_distributors', seconds, len(df_dst))
+    seconds, df_nth = timed(lambda: data_loader.load_all_north_data(data_dir, 1), repeat, cold)
+    record('load_north', seconds, len(df_nth))
+
+    # التحميل من لقطات Feather (إعادة تشغيل الخادم بعد أول تحميل)
+    cold()
+    data_loader.build_dataset(data_dir, 1)
+    seconds, dataset = timed(lambda: data_loader.build_dataset(data_dir, 1), repeat, data_loader.clear_caches)
+    record('load_snapshot', seconds, sum(len(dataset[k]) for k in ('stations', 'distributors', 'north')))
+
+    seconds, _ = timed(lambda: data_loader.build_aggregates(dataset['stations'], dataset['distributors'], dataset['north']), repeat)
+    record('aggregate', seconds, len(dataset['north']))
+    seconds, payload = timed(lambda: build_figures(dataset), repeat)
+    record('figure_build', seconds, len(dataset['north']))
+    stages['figure_build']['json_bytes'] = payload
+
+    if render:
+        os.environ['DASHBOARD_DATA_DIR'] = data_dir
+        os.environ['DASHBOARD_ARTIFACT'] = os.path.join(work_dir, 'no_artifact.pkl')
+        for label, seconds in render_tabs(repeat).items():
+            record(f"render:{label}", seconds, len(dataset['north']))
+    return {'rows': rows, 'files': [os.path.basename(p) for p in paths], 'stages': stages}
+
+
+def git_commit():
+    try: return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError): return None
+
+
+def compare(results, baseline, tolerance):
+    """يطبع نسبة الزمن الحالي للسابق لكل مرحلة؛ يعيد عدد المراحل الأبطأ من baseline × tolerance."""
+    old = {(r['rows'], name): s['seconds'] for r in baseline['results'] for name, s in r['stages'].items()}
+    regressions = 0
+    print(f"{'rows':>9}  {'stage':<40} {'old s':>10} {'new s':>10} {'ratio':>7}")
+    for r in results:
+        for name, s in r['stages'].items():
+            before = old.get((r['rows'], name))
+            if before is None or name == 'generate': continue
+            ratio = s['seconds'] / before if before > 0 else float('inf')
+            flag = ' !' if ratio > tolerance else ''
+            regressions += bool(flag)
+            print(f"{r['rows']:>9}  {name:<40} {before:>10.4f} {s['seconds']:>10.4f} {ratio:>7.2f}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="قياس أداء تحميل البيانات وبناء الرسوم على ملفات صناعية")
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000, 100000], help="أحجام البيانات (عدد صفوف المحولات)، حتى 1000000")
+    parser.add_argument('--repeat', type=int, default=1, help="عدد مرات تكرار كل مرحلة (يُسجل أقل زمن)")
+    parser.add_argument('--render', action='store_true', help="قياس رسم كل تبويب عبر AppTest")
+    parser.add_argument('--output', help="مسار ملف JSON للنتائج (الافتراضي: الطباعة فقط)")
+    parser.add_argument('--compare', help="ملف JSON من تشغيل سابق للمقارنة")
+    parser.add_argument('--tolerance', type=float, default=1.2, help="نسبة التباطؤ المسموحة قبل اعتبارها تراجعاً")
+    parser.add_argument('--work-dir', help="مجلد الملفات المولدة (الافتراضي: مجلد مؤقت يُحذف بعد القياس)")
+    args = parser.parse_args(argv)
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix='dashboard_bench_')
+    try:
+        results = []
+        for rows in args.rows:
+            results.append(bench_size(rows, work_dir, args.repeat, args.render))
+            for name, s in results[-1]['stages'].items():
+                print(f"{rows:>9}  {name:<40} {s['seconds']:>10.4f}s  {s['rows']:>9} rows")
+    finally:
+        if not args.work_dir: shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        'meta': {
+            'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+            'git_commit': git_commit(), 'python': platform.python_version(), 'pandas': pd.__version__,
+            'platform': platform.platform(), 'repeat': args.repeat,
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f: json.dump(report, f, ensure_ascii=False, indent=1)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f: baseline = json.load(f)
+        return 1 if compare(results, baseline, args.tolerance) else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,111 @@
+import argparse
+import os
+import random
+import openpyxl
+
+# ==========================================
+# توليد ملفات Excel صناعية بنفس تنسيق ملفات اللوحة
+# ==========================================
+# كل الملفات تحاكي الملفات الحقيقية: صفوف عنوان قبل صف العناوين، خلايا قطاع فارغة تُملأ بـ ffill،
+# صفوف إجمالي، أسماء قصيرة تُستبعد، وخليط من .xls و.xlsx (كتابة .xls تحتاج xlwt: benchmarks/requirements.txt).
+
+try: import xlwt
+except ImportError: xlwt = None
+
+# ورقة .xls لا تتجاوز 65536 صفاً (مع صفوف العنوان والإجمالي)
+XLS_MAX_ROWS = 65536 - 10
+
+SECTORS = ['قطاع شمال الاسماعيليه', 'قطاع جنوب الاسماعيلية', 'قطاعى فايد', 'قطاع القنطرة شرق', 'قطاع التل الكبير', 'قطاع ابو صوير']
+ENGINEERINGS = ['هندسة اول', 'هندسة ثان', 'هندسة ثالث', 'هندسة رابع', 'هندسة الحي', 'هندسة القرى']
+NORTH_FILES = [
+    ('اسماعيلية اول ملك الشركة', '.xlsx'), ('اسماعيلية اول ملك الغير', '.xlsx'),
+    ('اسماعيلية ثان ملك الشركة', '.xls'), ('اسماعيلية ثان ملك الغير', '.xlsx'),
+    ('الشيخ زايد ملك الشركة', '.xlsx'), ('الشيخ زايد ملك الغير', '.xlsx'),
+]
+TYPE_TEXTS = ['كشك', 'غرفة', 'غرفه', 'هوائي', 'معلق', '', 'كشك ']
+CAPACITIES = [100, 250, 500, 630, 1000, '1,000', '1 500', 'غير معروف', '']
+
+def _write_xlsx(path, rows):
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet()
+    for row in rows: ws.append(row)
+    wb.save(path)
+
+def _write_xls(path, rows):
+    wb = xlwt.Workbook(encoding='utf-8')
+    ws = wb.add_sheet('Sheet1')
+    for i, row in enumerate(rows):
+        for j, v in enumerate(row):
+            if v is not None: ws.write(i, j, v)
+    wb.save(path)
+
+def write_sheet(path, rows):
+    """يكتب الصفوف بصيغة الملف حسب امتداده ويعيد المسار."""
+    if path.endswith('.xls'):
+        if xlwt is None: raise RuntimeError("كتابة ملفات .xls تحتاج مكتبة xlwt: pip install -r benchmarks/requirements.txt")
+        _write_xls(path, list(rows))
+    else: _write_xlsx(path, rows)
+    return path
+
+def north_rows(n, rng):
+    yield ['جدول حصر المحولات']
+    yield []
+    yield [None, 'بيان المحولات حتى تاريخه']
+    yield ['م', 'الهندسة', 'المحول', 'القدرة', 'كشك/غرفة', 'الملكية']
+    for i in range(1, n + 1):
+        # كل 500 صف: صف إجمالي أو اسم قصير (يُستبعد عند التحميل)
+        if i % 500 == 0:
+            yield [None, None, rng.choice(['اجمالي', 'Total', 'عدد المحولات', 'x']), n, None, None]
+            continue
+        name = f"محول {rng.choice(['غرفة', 'كشك', 'المدرسة', 'السوق', 'المستشفى'])} {i}"
+        yield [i, rng.choice(ENGINEERINGS), name, rng.choice(CAPACITIES), rng.choice(TYPE_TEXTS), 'شركة']
+    yield [None, None, 'الاجمالي', n, None, None]
+
+def distributor_rows(n, rng):
+    yield ['م', 'الهندسة', None, 'مسلسل', 'اسم الموزع']
+    sector = engineering = None
+    group = serial = 0
+    for i in range(1, n + 1):
+        # القطاع والهندسة يُكتبان في أول صف من كل مجموعة فقط (كالخلايا المدمجة)
+        new_sector = sector is None or rng.random() < 0.01
+        if new_sector: sector, serial = rng.choice(SECTORS), 0
+        new_eng = new_sector or rng.random() < 0.05
+        if new_eng: engineering, group = rng.choice(ENGINEERINGS), group + 1
+        serial += 1
+        yield [group if new_eng else None, sector if new_sector else None, engineering if new_eng else None, serial, f"موزع {i}"]
+    yield ['اجمالي', None, f"{group} هندسات", 'الاجمالي', f"{n} موزع"]
+
+def station_rows(n, rng):
+    yield ['م', 'القطاع', 'م المحطات', 'المحطة', 'ملاحظات']
+    for i in range(1, n + 1):
+        name = f"محطة {i}" if i % 200 else 'x'
+        yield [i, rng.choice(SECTORS), i, name, rng.choice(['', 'تحت الصيانة', None])]
+
+def generate(out_dir, rows, seed=0):
+    """ينشئ مجلد بيانات كامل: rows صف موزعة على ملفات الشمال، ومثلها للموزعات وعُشرها للمحطات.
+    يعيد قائمة المسارات المكتوبة."""
+    rng = random.Random(seed)
+    os.makedirs(out_dir, exist_ok=True)
+    written = [write_sheet(os.path.join(out_dir, 'Electricity_Stations_Final_Cleaned.xlsx'), station_rows(max(1, rows // 10), rng)),
+               write_sheet(os.path.join(out_dir, 'Excel distributions 517.xlsx'), distributor_rows(rows, rng))]
+    for (name, ext), n in zip(NORTH_FILES, north_file_rows(rows)):
+        written.append(write_sheet(os.path.join(out_dir, name + ext), north_rows(n, rng)))
+    return written
+
+def north_file_rows(rows):
+    """توزيع الصفوف بالتساوي على ملفات الشمال؛ ملف .xls لا يتجاوز XLS_MAX_ROWS والباقي يُوزع على ملفات .xlsx."""
+    counts = [rows // len(NORTH_FILES) + (i < rows % len(NORTH_FILES)) for i in range(len(NORTH_FILES))]
+    xlsx = [i for i, (_, ext) in enumerate(NORTH_FILES) if ext == '.xlsx']
+    for i, (_, ext) in enumerate(NORTH_FILES):
+        if ext != '.xls' or counts[i] <= XLS_MAX_ROWS: continue
+        overflow, counts[i] = counts[i] - XLS_MAX_ROWS, XLS_MAX_ROWS
+        for j, k in enumerate(xlsx): counts[k] += overflow // len(xlsx) + (j < overflow % len(xlsx))
+    return counts
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='توليد مجلد بيانات صناعي للقياس')
+    parser.add_argument('output', help='مجلد الإخراج')
+    parser.add_argument('--rows', type=int, default=10000, help='عدد صفوف المحولات (مجموع ملفات الشمال)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    for path in generate(args.output, args.rows, args.seed): print(path)
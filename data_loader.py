@@ -0,0 +1,555 @@
+import pandas as pd
+import numpy as np
+import plotly.express as px
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pandas.api.types import union_categoricals
+from pandas.io.parsers import TextParser
+import logging
+import multiprocessing
+import threading
+import openpyxl
+import xlrd
+import hashlib
+import math
+import os
+import time
+from functools import lru_cache
+from arabic_text import clean_sector_series, map_unique, normalize_letters, normalize_series, normalize_search_series, normalize_token
+import snapshot_store
+from instrumentation import annotate, instrumented, record_stage, stage
+
+logger = logging.getLogger(__name__)
+
+# ==========================================
+# الإعدادات من متغيرات البيئة
+# ==========================================
+def env_int(name, default, minimum=1):
+    """عدد صحيح من متغير البيئة name لا يقل عن minimum؛ القيمة غير الصالحة تعيد default."""
+    try: return max(minimum, int(os.environ.get(name, default)))
+    except ValueError: return default
+
+def env_float(name, default, minimum=0.0):
+    """مثل env_int لقيمة عشرية."""
+    try: return max(minimum, float(os.environ.get(name, default)))
+    except ValueError: return default
+
+# ==========================================
+# قراءة ملفات محولات قطاع الشمال
+# ==========================================
+def classify_transformer_types(df, type_cols, col_name):
+    """تصنيف نوع المحول (غرفة / كشك / هوائي) على مستوى الأعمدة كاملة بدلاً من apply لكل صف.
+    الأولوية: نص أعمدة النوع (غرف ثم كشك ثم هواي/علق) ثم اسم المحول (غرف) ثم الافتراضي كشك."""
+    no_match = pd.Series(False, index=df.index)
+    is_room, is_kiosk, is_air = no_match, no_match, no_match
+    for col in type_cols:
+        text = normalize_series(df[col])
+        is_room = is_room | text.str.contains('غرف', regex=False, na=False)
+        is_kiosk = is_kiosk | text.str.contains('كشك', regex=False, na=False)
+        is_air = is_air | text.str.contains('هواي|علق', regex=True, na=False)
+    name_room = normalize_series(df[col_name]).str.contains('غرف', regex=False, na=False) if col_name else no_match
+    return pd.Series(np.select(
+        [is_room, is_kiosk, is_air, name_room],
+        ['غرفة', 'كشك', 'هوائي', 'غرفة'],
+        default='كشك'
+    ), index=df.index)
+
+HEADER_SCAN_ROWS = 50
+
+def _openpyxl_cell(cell):
+    # نفس تحويلات pandas لخلايا openpyxl
+    if cell.value is None: return ""
+    if cell.data_type == 'e': return float('nan')
+    if cell.data_type == 'n':
+        val = int(cell.value)
+        return val if val == cell.value else float(cell.value)
+    return cell.value
+
+def _xlrd_cell(cell, datemode):
+    # نفس تحويلات pandas لخلايا xlrd
+    if cell.ctype == xlrd.XL_CELL_DATE:
+        try: return xlrd.xldate.xldate_as_datetime(cell.value, datemode)
+        except OverflowError: return cell.value
+    if cell.ctype == xlrd.XL_CELL_ERROR: return float('nan')
+    if cell.ctype == xlrd.XL_CELL_BOOLEAN: return bool(cell.value)
+    if cell.ctype == xlrd.XL_CELL_NUMBER and math.isfinite(cell.value):
+        val = int(cell.value)
+        return val if val == cell.value else cell.value
+    return cell.value
+
+def iter_sheet_rows(file_path):
+    """يقرأ صفوف الورقة الأولى صفاً بصف دون تحميل الورقة كاملة في جدول."""
+    if file_path.lower().endswith('.xls'):
+        book = xlrd.open_workbook(file_path, on_demand=True)
+        try:
+            sheet = book.sheet_by_index(0)
+            for i in range(sheet.nrows):
+                yield [_xlrd_cell(c, book.datemode) for c in sheet.row(i)]
+        finally: book.release_resources()
+    else:
+        wb = openpyxl.load_workbook(file_path, read_only=True, data_only=True, keep_links=False)
+        try:
+            ws = wb.worksheets[0]
+            ws.reset_dimensions()
+            for row in ws.rows:
+                values = [_openpyxl_cell(c) for c in row]
+                while values and values[-1] == "": values.pop()
+                yield values
+        finally: wb.close()
+
+def is_header_row(values):
+    row_str = " ".join(str(v) for v in values)
+    return ('اسم' in row_str and 'محول' in row_str) or ('كشك' in row_str and 'غرفة' in row_str) or ('قدرة' in row_str)
+
+def ingest_chunk_rows():
+    """عدد صفوف كل دفعة عند قراءة ملفات الشمال (المتغير NORTH_INGEST_CHUNK_ROWS، الافتراضي 10000)."""
+    return env_int('NORTH_INGEST_CHUNK_ROWS', 10000)
+
+def read_sheet_header(rows):
+    """يبحث عن صف العناوين في أول 50 صفاً من rows ويعيد أسماء الأعمدة كما يسميها pandas
+    (Unnamed للخلايا الفارغة، .1 للأسماء المكررة) أو None؛ rows يبقى عند أول صف بعد العناوين."""
+    for idx, values in enumerate(rows):
+        if idx >= HEADER_SCAN_ROWS: break
+        if is_header_row(values): return TextParser([values], header=0).read().columns
+    return None
+
+def iter_sheet_chunks(rows, columns, chunk_rows=None):
+    """يقرأ باقي صفوف الورقة في جداول متتالية بحد أقصى chunk_rows صف وبنفس أسماء الأعمدة،
+    فلا تُحمّل الورقة كاملة في الذاكرة. القيم تبقى كما في الخلايا (dtype=object) والخلايا الفارغة NaN،
+    والأعمدة الزائدة بعد آخر عنوان تُهمل."""
+    if chunk_rows is None: chunk_rows = ingest_chunk_rows()
+    width = len(columns)
+    header = list(range(width))
+    chunk = []
+    for values in rows:
+        chunk.append(values[:width] + [""] * (width - len(values)))
+        if len(chunk) >= chunk_rows:
+            yield _chunk_frame(header, chunk, columns)
+            chunk = []
+    if chunk: yield _chunk_frame(header, chunk, columns)
+
+def _chunk_frame(header, chunk, columns):
+    # TextParser يطبق نفس قيم NA التي يستخدمها pandas عند قراءة Excel
+    df = TextParser([header] + chunk, header=0, skip_blank_lines=False, dtype=object).read()
+    df.columns = columns
+    return df
+
+@lru_cache(maxsize=256)
+def district_and_owner(filename):
+    """الهندسة والملكية من اسم الملف (مثال: «اسماعيلية ثان ملك الشركة.xls»)."""
+    fname_clean = normalize_token(filename)
+    if 'زايد' in fname_clean: dist = 'الشيخ زايد'
+    elif ('اول' in fname_clean or '1' in fname_clean) and 'ثان' not in fname_clean: dist = 'إسماعيلية أول'
+    elif 'ثان' in fname_clean or '2' in fname_clean or 'تاني' in fname_clean: dist = 'إسماعيلية ثان'
+    else: dist = 'غير محدد' 
+    owner = 'ملك الشركة' if 'شركه' in fname_clean else ('ملك الغير' if 'غير' in fname_clean else 'غير محدد')
+    return dist, owner
+
+def transformer_columns(columns):
+    """أعمدة ملف المحولات من أسماء العناوين: (عمود الاسم، أعمدة النوع، عمود القدرة)."""
+    col_name = next((c for c in columns if 'اسم' in c or 'محول' in c or 'بيان' in c), None)
+    type_cols = [c for c in columns if 'نوع' in c or 'كشك' in c or 'غرف' in c]
+    col_cap = next((c for c in columns if 'قدرة' in c or 'kva' in c.lower()), None)
+    return col_name, type_cols, col_cap
+
+def _transformer_chunk(df, col_name, type_cols, col_cap, classify_totals=None):
+    """يرشح دفعة واحدة ويصنفها؛ يعيد (الأسماء، الأنواع، القدرات) كمصفوفات فقط.
+    زمن التصنيف وعدد صفوفه يُضافان إلى classify_totals لتسجيلهما كمرحلة واحدة للملف."""
+    df_clean = df.dropna(subset=[col_name])
+    names = df_clean[col_name].astype(str)
+    keep = ~names.str.contains('total|اجمالي|عدد', case=False, na=False) & (names.str.len() > 1)
+    df_clean, names = df_clean[keep], names[keep]
+    start = time.perf_counter()
+    types = classify_transformer_types(df_clean, type_cols, col_name)
+    if classify_totals is not None:
+        classify_totals['seconds'] += time.perf_counter() - start
+        classify_totals['rows'] += len(df_clean)
+    if col_cap:
+        capacity = pd.to_numeric(df_clean[col_cap].astype(str).str.replace(',', '').str.replace(' ', ''), errors='coerce').fillna(0)
+    else: capacity = pd.Series(0.0, index=df_clean.index)
+    # الاسم يُحفظ كنص حتى لو كانت الخلية رقماً أو تاريخاً، فيبقى العمود بنفس النوع بعد حفظه كلقطة Feather
+    return names.to_numpy(dtype=object), types.to_numpy(dtype=object), capacity.to_numpy()
+
+def process_file_final(file_path, filename):
+    """يقرأ ملف محولات على دفعات (ingest_chunk_rows صف في كل مرة): كل دفعة تُرشح وتُصنف ثم يُحفظ منها
+    أعمدة الناتج فقط، فأقصى ذاكرة = دفعة واحدة + الناتج وليس الورقة كاملة.
+    يعيد None إذا لم يكن الملف جدول محولات (لا صف عناوين أو لا عمود اسم)؛ أخطاء القراءة تُرفع للمستدعي."""
+    rows = iter_sheet_rows(file_path)
+    try:
+        with stage('parse_sheet', file=filename) as record:
+            columns = read_sheet_header(rows)
+            if columns is None: return None
+            columns = columns.astype(str).str.strip()
+            col_name, type_cols, col_cap = transformer_columns(columns)
+            if not col_name: return None
+            parts, record['rows'] = [], 0
+            classify_totals = {'seconds': 0.0, 'rows': 0}
+            for chunk in iter_sheet_chunks(rows, columns):
+                record['rows'] += len(chunk)
+                part = _transformer_chunk(chunk, col_name, type_cols, col_cap, classify_totals)
+                if len(part[0]): parts.append(part)
+            # سجل تصنيف واحد لكل ملف مهما كان عدد الدفعات
+            record_stage('classify', classify_totals['seconds'], classify_totals['rows'], file=filename)
+    finally: rows.close()
+
+    if not parts: parts = [(np.empty(0, dtype=object), np.empty(0, dtype=object), np.empty(0))]
+    names, types, capacity = (np.concatenate(col) for col in zip(*parts))
+    dist, owner = district_and_owner(filename)
+    # الأسماء والأنواع تُبنى من قوائم Python حتى يستنتج pandas نوع النص كما عند قراءة الورقة كاملة
+    return pd.DataFrame({
+        'الهندسة': dist, 'الملكية': owner, 'اسم المحول': pd.Series(names.tolist()),
+        'النوع': pd.Series(types.tolist()), 'القدرة': capacity,
+        'القطاع': 'قطاع شمال الاسماعيليه' 
+    })
+
+def file_fingerprint(path):
+    stat = os.stat(path)
+    return (path, stat.st_size, stat.st_mtime_ns)
+
+# ==========================================
+# مخزن الملفات المحمّلة (ذاكرة + لقطات Feather)
+# ==========================================
+# لكل نوع مصدر: المسار -> (البصمة، الجداول الناتجة {الاسم: DataFrame})
+# (الموديول يُستورد مرة واحدة فيبقى المخزن بين إعادات تشغيل الصفحة)
+_source_cache = {'stations': {}, 'distributors': {}, 'north': {}}
+_source_cache_lock = threading.Lock()
+# الملفات التي فشل تحليلها في آخر تحميل (لا تُحفظ في المخزن فيُعاد تحليلها في التحميل التالي)
+_failed_sources = set()
+
+def parse_each(parse):
+    """يحوّل دالة تحليل ملف واحد إلى parse_many: الملف الذي يرفع خطأ يُعاد None (فشل مؤقت) ولا يوقف باقي الملفات."""
+    def parse_many(paths):
+        results = []
+        for p in paths:
+            try: results.append(parse(p))
+            except Exception:
+                logger.exception("failed to parse %s", p)
+                results.append(None)
+        return results
+    return parse_many
+
+def load_sources(kind, paths, parse_many, data_dir='.'):
+    """يعيد جداول كل ملف في paths بنفس الترتيب: من الذاكرة إن لم يتغير الملف،
+    ثم من لقطة Feather صالحة، وأخيراً بتحليل ملف Excel عبر parse_many للملفات المتبقية فقط.
+    parse_many يعيد None للملف الذي فشل تحليله: يُعاد None مكانه ولا يُحفظ في الذاكرة ولا كلقطة."""
+    with _source_cache_lock:
+        cache = _source_cache[kind]
+        # حذف الملفات التي لم تعد موجودة من المخزن
+        for p in [p for p in cache if p not in paths]: del cache[p]
+        fingerprints = {p: file_fingerprint(p) for p in paths}
+        stale = [p for p in paths if p not in cache or cache[p][0] != fingerprints[p]]
+        to_parse = []
+        for p in stale:
+            frames = snapshot_store.load_snapshot(fingerprints[p], data_dir)
+            if frames is None: to_parse.append(p)
+            else: cache[p] = (fingerprints[p], frames)
+        _failed_sources.difference_update(paths)
+        for p, frames in zip(to_parse, parse_many(to_parse)):
+            if frames is None:
+                _failed_sources.add(p)
+                continue
+            cache[p] = (fingerprints[p], frames)
+            snapshot_store.save_snapshot(fingerprints[p], frames, data_dir)
+        if to_parse: snapshot_store.drop_missing_snapshots(data_dir)
+        # نتيجة المخزن للمرحلة المقاسة: hit (كل الملفات من الذاكرة)، snapshot، أو miss (تحليل ملف واحد على الأقل)
+        annotate(cache='miss' if to_parse else ('snapshot' if stale else 'hit'), files=len(paths), parsed=len(to_parse))
+        return [cache[p][1] if p in cache else None for p in paths]
+
+def failed_sources(paths):
+    """الملفات من paths التي فشل تحليلها في آخر تحميل."""
+    with _source_cache_lock: return sorted(p for p in paths if p in _failed_sources)
+
+# ==========================================
+# تقليل حجم الجداول في الذاكرة
+# ==========================================
+# أعمدة التصنيف قليلة القيم تُخزن كـ category بدلاً من تكرار النص في كل صف
+CATEGORY_COLUMNS = ['القطاع', 'الهندسة', 'الملكية', 'النوع', 'قطاع_للرسم']
+
+def compact_frame(df):
+    """يحوّل أعمدة التصنيف إلى category ويصغّر الأعمدة الرقمية لأصغر نوع يكفي قيمها."""
+    for col in df.columns:
+        if col in CATEGORY_COLUMNS: df[col] = df[col].astype('category')
+        elif pd.api.types.is_bool_dtype(df[col]): continue
+        elif pd.api.types.is_integer_dtype(df[col]): df[col] = pd.to_numeric(df[col], downcast='integer')
+        elif pd.api.types.is_float_dtype(df[col]): df[col] = pd.to_numeric(df[col], downcast='float')
+    return df
+
+def concat_compact(frames):
+    """يدمج جداول مضغوطة بـ compact_frame مع إبقاء أعمدة category (pd.concat يحوّلها لنص إذا اختلفت فئاتها)."""
+    cat_cols = [c for c in frames[0].columns if isinstance(frames[0][c].dtype, pd.CategoricalDtype)]
+    dtypes = {c: pd.CategoricalDtype(union_categoricals([f[c] for f in frames], sort_categories=True).categories) for c in cat_cols}
+    return pd.concat([f.astype(dtypes) for f in frames], ignore_index=True)
+
+# ==========================================
+# المحطات العامة والموزعات (517)
+# ==========================================
+STATIONS_FILE = 'Electricity_Stations_Final_Cleaned.xlsx'
+
+def _parse_stations(path):
+    df = pd.read_excel(path)
+    df['القطاع'] = clean_sector_series(df['القطاع'])
+    col_name = 'المحطة' if 'المحطة' in df.columns else df.columns[1]
+    df = df.dropna(subset=[col_name]) 
+    df = df[df[col_name].astype(str).str.len() > 1]
+    if 'ملاحظات' in df.columns: df['ملاحظات'] = df['ملاحظات'].fillna('لا توجد ملاحظات')
+    else: df['ملاحظات'] = 'غير متوفر'
+    df['العدد'] = 1
+    return {'df': compact_frame(df)}
+
+def stations_path(data_dir='.'):
+    path = os.path.join(data_dir, STATIONS_FILE)
+    return path if os.path.exists(path) else None
+
+@instrumented('load_stations')
+def load_stations(data_dir='.'):
+    path = stations_path(data_dir)
+    if path is None: return None
+    frames = load_sources('stations', [path], parse_each(_parse_stations), data_dir)[0]
+    return None if frames is None else frames['df']
+
+def _parse_distributors(path):
+    if path.endswith('.csv'): df = pd.read_csv(path).iloc[:, [1, 2, 3, 4]]
+    else: df = pd.read_excel(path).iloc[:, [1, 2, 3, 4]]
+    df.columns = ['القطاع', 'الهندسة', 'مسلسل', 'الموزع']
+    df = df.replace('nan', pd.NA).ffill()
+    df = df[pd.to_numeric(df['مسلسل'], errors='coerce').notnull()].copy()
+    df['مسلسل'] = pd.to_numeric(df['مسلسل'])
+    df['القطاع'] = clean_sector_series(df['القطاع'])
+    df['الهندسة'] = df['الهندسة'].astype(str).str.strip()
+    eng_counts = df.groupby('القطاع', observed=True)['الهندسة'].nunique()
+    df['قطاع_للرسم'] = map_unique(df['القطاع'], lambda x: f"{x} (هندسات: {eng_counts.get(x, 0)})")
+    df['عدد_الموزعات'] = 1
+    summary = df.groupby('القطاع', observed=True).agg({'الهندسة': 'nunique', 'الموزع': 'count'}).reset_index()
+    summary.columns = ['القطاع', 'عدد الهندسات', 'عدد الموزعات']
+    return {'df': compact_frame(df), 'summary': summary}
+
+def distributors_path(data_dir='.'):
+    files = sorted(f for f in os.listdir(data_dir) if "517" in f and (f.endswith('.xlsx') or f.endswith('.csv')))
+    return os.path.join(data_dir, files[0]) if files else None
+
+@instrumented('load_distributors')
+def load_distributors(data_dir='.'):
+    path = distributors_path(data_dir)
+    if path is None: return None, None
+    frames = load_sources('distributors', [path], parse_each(_parse_distributors), data_dir)[0]
+    if frames is None: return None, None
+    return frames['df'], frames['summary']
+
+# ==========================================
+# تحميل كل ملفات قطاع الشمال
+# ==========================================
+def ingest_workers():
+    """عدد العمليات المستخدمة لقراءة ملفات الشمال (المتغير NORTH_INGEST_WORKERS، الافتراضي 1 = بدون توازي)."""
+    return env_int('NORTH_INGEST_WORKERS', 1)
+
+def _parse_north_file(path):
+    # {} = الملف ليس جدول محولات (نتيجة صالحة تُحفظ)، بينما الخطأ يُرفع فيُعاد تحليل الملف لاحقاً
+    df = process_file_final(path, os.path.basename(path))
+    if df is None: return {}
+    # كل ملف يُضغط قبل حفظه في المخزن واللقطة، فلا تبقى نسخة غير مضغوطة في الذاكرة بجانب الجدول المدمج
+    df['القطاع'] = clean_sector_series(df['القطاع'])
+    return {'df': compact_frame(df)}
+
+def parse_north_files(paths, workers=1):
+    """يقرأ الملفات بالتوازي على عدة عمليات ويعيد النتائج بنفس ترتيب paths؛ فشل ملف لا يوقف باقي الملفات.
+    الملف الذي فشل (خطأ في التحليل أو توقف العملية) يُعاد None فلا يُحفظ ويُعاد تحليله في التحميل التالي."""
+    if workers <= 1 or len(paths) <= 1:
+        return parse_each(_parse_north_file)(paths)
+    results = []
+    # spawn بدلاً من fork لأن خادم streamlit متعدد الخيوط
+    ctx = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=min(workers, len(paths)), mp_context=ctx) as pool:
+        futures = [pool.submit(_parse_north_file, p) for p in paths]
+        for p, fut in zip(paths, futures):
+            try: results.append(fut.result())
+            except BrokenProcessPool:
+                # توقف عملية (نفاد الذاكرة مثلاً) يُفشل كل الملفات التي لم تنتهِ بعد، وليس الملف نفسه فقط
+                logger.error("worker crashed before %s was parsed; will retry on next load", p)
+                results.append(None)
+            except Exception:
+                logger.exception("failed to parse %s", p)
+                results.append(None)
+    return results
+
+def list_north_files(data_dir='.'):
+    excluded = [STATIONS_FILE, 'requirements.txt', 'app.py', '.git']
+    return sorted(f for f in os.listdir(data_dir) if f.endswith(('.xls', '.xlsx')) and f not in excluded and "517" not in f and not f.startswith('~$'))
+
+@instrumented('load_north')
+def load_all_north_data(data_dir='.', workers=None):
+    if workers is None: workers = ingest_workers()
+    paths = [os.path.join(data_dir, f) for f in list_north_files(data_dir)]
+    parse_many = lambda stale: parse_north_files(stale, workers)
+    all_dfs = [frames['df'] for frames in load_sources('north', paths, parse_many, data_dir) if frames and 'df' in frames]
+    return concat_compact(all_dfs) if all_dfs else pd.DataFrame()
+
+# ==========================================
+# بناء البيانات الجاهزة للوحة (Dataset / Artifact)
+# ==========================================
+ARTIFACT_FORMAT = 3
+
+def data_dir():
+    """مجلد ملفات Excel (المتغير DASHBOARD_DATA_DIR، الافتراضي المجلد الحالي)."""
+    return os.environ.get('DASHBOARD_DATA_DIR', '.')
+
+def artifact_path():
+    """مسار الملف الجاهز (المتغير DASHBOARD_ARTIFACT، الافتراضي dashboard_artifact.pkl)."""
+    return os.environ.get('DASHBOARD_ARTIFACT', 'dashboard_artifact.pkl')
+
+@instrumented('aggregate', rows=lambda aggregates: len(aggregates['north_cube']))
+def build_aggregates(df_st, df_dst, df_nth):
+    all_sectors = set()
+    if df_st is not None: all_sectors.update(df_st['القطاع'].unique())
+    if df_dst is not None: all_sectors.update(df_dst['القطاع'].unique())
+    sectors = sorted(s for s in all_sectors if s != "غير محدد" and str(s) != 'nan' and "شمال - جنوب" not in s)
+
+    # مكعب المحولات: العدد ومجموع القدرة لكل (القطاع × الهندسة × الملكية × النوع)
+    north_keys = ['القطاع', 'الهندسة', 'الملكية', 'النوع']
+    if df_nth is not None and not df_nth.empty:
+        # الجمع بـ float64 حتى لا يفقد مجموع القدرة دقته بعد تصغير العمود إلى float32
+        north_cube = (df_nth.astype({'القدرة': 'float64'}).groupby(north_keys, observed=True)
+                      .agg(العدد=('القدرة', 'size'), القدرة=('القدرة', 'sum')).reset_index())
+    else: north_cube = pd.DataFrame(columns=north_keys + ['العدد', 'القدرة'])
+
+    # عدد الموزعات لكل (القطاع × الهندسة)
+    if df_dst is not None:
+        dist_cube = df_dst.groupby(['القطاع', 'قطاع_للرسم', 'الهندسة'], observed=True).size().reset_index(name='العدد')
+    else: dist_cube = pd.DataFrame(columns=['القطاع', 'قطاع_للرسم', 'الهندسة', 'العدد'])
+
+    # عدد المحطات لكل قطاع
+    if df_st is not None:
+        stations_per_sector = df_st['القطاع'].value_counts().reset_index()
+        stations_per_sector.columns = ['القطاع', 'العدد']
+        stations_per_sector = stations_per_sector[stations_per_sector['العدد'] > 0]
+    else: stations_per_sector = pd.DataFrame(columns=['القطاع', 'العدد'])
+
+    return {'sectors': sectors, 'north_cube': north_cube, 'dist_cube': dist_cube, 'stations_per_sector': stations_per_sector}
+
+def source_paths(data_dir='.'):
+    paths = [stations_path(data_dir), distributors_path(data_dir)]
+    return [p for p in paths if p is not None] + [os.path.join(data_dir, f) for f in list_north_files(data_dir)]
+
+def dataset_version(data_dir='.'):
+    """بصمة مختصرة لكل ملفات المصدر الحالية (تتغير عند إضافة/تعديل/حذف أي ملف)."""
+    sources = sorted(file_fingerprint(p) for p in source_paths(data_dir))
+    return hashlib.sha1(repr(sources).encode('utf-8')).hexdigest()[:12]
+
+# آخر قاموس بيانات لكل مجلد: مشترك بين كل الجلسات بدون نسخ (للقراءة فقط)
+_dataset_cache = {}
+
+@instrumented('build_dataset')
+def build_dataset(data_dir='.', workers=None):
+    """يحمّل كل المصادر ويعيد قاموس البيانات الذي تعرضه اللوحة (الجداول + التجميعات).
+    إذا لم يتغير أي ملف يُعاد نفس القاموس السابق دون إعادة الدمج أو التجميع."""
+    version = dataset_version(data_dir)
+    cached = _dataset_cache.get(os.path.abspath(data_dir))
+    if cached is not None and cached['version'] == version:
+        annotate(cache='hit')
+        return cached
+    annotate(cache='miss')
+    df_st = load_stations(data_dir)
+    df_dst, df_dst_summ = load_distributors(data_dir)
+    df_nth = load_all_north_data(data_dir, workers)
+    failed = failed_sources(source_paths(data_dir))
+    if failed:
+        # البيانات الناقصة تأخذ إصداراً خاصاً بها: مخازن الرسوم والفهارس المرتبطة بالإصدار لا تخلطها بالبيانات الكاملة بعد نجاح التحليل
+        version += '-' + hashlib.sha1(repr(failed).encode('utf-8')).hexdigest()[:6]
+    dataset = {
+        'format': ARTIFACT_FORMAT,
+        'version': version,
+        'stations': df_st, 'distributors': df_dst, 'distributors_summary': df_dst_summ, 'north': df_nth,
+        'aggregates': build_aggregates(df_st, df_dst, df_nth),
+        # False إذا فشل تحليل ملف: البيانات تُعرض بدونه ويُعاد تحليله في التحميل التالي
+        'complete': not failed,
+    }
+    # لا نحفظ النتيجة إذا تغيّر ملف أثناء التحميل أو كانت ناقصة؛ إعادة التشغيل التالية ستبنيها من جديد
+    if dataset_version(data_dir) == version: _dataset_cache[os.path.abspath(data_dir)] = dataset
+    return dataset
+
+def clear_caches():
+    """يفرغ مخزن الملفات وقاموس البيانات المحفوظين في الذاكرة (اللقطات على القرص لا تُحذف)."""
+    with _source_cache_lock:
+        for cache in _source_cache.values(): cache.clear()
+    _dataset_cache.clear()
+
+def save_artifact(dataset, path):
+    tmp = path + '.tmp'
+    pd.to_pickle(dataset, tmp)
+    os.replace(tmp, path)
+
+@instrumented('load_artifact')
+def load_artifact(path):
+    dataset = pd.read_pickle(path)
+    if not isinstance(dataset, dict) or dataset.get('format') != ARTIFACT_FORMAT:
+        raise ValueError(f"{path}: ملف جاهز بإصدار غير مدعوم، أعد تشغيل precompute.py")
+    return dataset
+
+# ==========================================
+# تقليل تفاصيل الرسوم الشمسية (Level of Detail)
+# ==========================================
+OTHERS_LABEL = 'أخرى'
+
+def sunburst_top_n():
+    """أقصى عدد للعناصر الظاهرة تحت كل أب في الرسم الشمسي (المتغير DASHBOARD_SUNBURST_TOP_N، الافتراضي 25)."""
+    return env_int('DASHBOARD_SUNBURST_TOP_N', 25)
+
+def limit_sunburst_leaves(df, path, values=None, top_n=None, extra_cols=(), expand=None):
+    """يجمّع الجدول على مستوى path ويحتفظ بأكبر top_n ورقة تحت كل أب (حسب values أو العدد)،
+    والباقي يُجمع في عقدة واحدة «أخرى (n)». الأب المحدد في expand (قيم path[:-1]) تظهر كل أوراقه.
+    يعيد (الجدول، اسم عمود القيم) لاستخدامهما في px.sunburst."""
+    if top_n is None: top_n = sunburst_top_n()
+    parents, leaf = list(path[:-1]) + list(extra_cols), path[-1]
+    value_col = values or 'العدد'
+    if values: leaves = df.groupby(parents + [leaf], observed=True, sort=False)[values].sum().reset_index()
+    else: leaves = df.groupby(parents + [leaf], observed=True, sort=False).size().reset_index(name=value_col)
+    rank = leaves.groupby(parents, observed=True, sort=False)[value_col].rank(method='first', ascending=False)
+    keep = rank <= top_n
+    if expand is not None:
+        keep |= (leaves[list(path[:-1])] == pd.Series(expand, index=list(path[:-1]))).all(axis=1)
+    rest = leaves[~keep]
+    if rest.empty: return leaves, value_col
+    others = rest.groupby(parents, observed=True, sort=False).agg(**{value_col: (value_col, 'sum'), '_n': (leaf, 'size')}).reset_index()
+    others[leaf] = OTHERS_LABEL + ' (' + others.pop('_n').astype(str) + ')'
+    kept = leaves[keep].astype({leaf: object})
+    return pd.concat([kept, others[kept.columns]], ignore_index=True), value_col
+
+def truncated_sunburst_parents(df, path, top_n=None):
+    """الآباء (قيم path[:-1]) الذين لديهم أكثر من top_n ورقة مختلفة، أي التي يجمع limit_sunburst_leaves بعض أوراقها في «أخرى»."""
+    if top_n is None: top_n = sunburst_top_n()
+    counts = df.groupby(list(path[:-1]), observed=True)[path[-1]].nunique()
+    return counts.index[counts > top_n]
+
+def sunburst(df, path, color=None, **kwargs):
+    # px.sunburst لا يقبل أعمدة category في path/color فتُحوّل لنص عند بناء الرسم فقط
+    used = [c for c in list(path) + [color] if c is not None and isinstance(df[c].dtype, pd.CategoricalDtype)]
+    if used: df = df.astype({c: str for c in used})
+    return px.sunburst(df, path=path, color=color, **kwargs)
+
+# ==========================================
+# فهرس البحث والترتيب للجداول
+# ==========================================
+def build_table_index(df, search_cols):
+    """نص البحث الموحد لكل صف (أعمدة search_cols) مع مخزن لترتيب الصفوف حسب كل عمود يُملأ عند الطلب."""
+    search = pd.Series('', index=df.index)
+    for col in search_cols:
+        if col in df.columns: search = search + ' ' + normalize_search_series(df[col])
+    return {'search': search.reset_index(drop=True), 'order': {}}
+
+def sort_order(df, index, col):
+    """مواضع الصفوف (0..n-1) مرتبة تصاعدياً حسب العمود col؛ تُحسب مرة واحدة لكل عمود."""
+    if col not in index['order']:
+        values = df[col]
+        if not pd.api.types.is_numeric_dtype(values): values = values.astype(str)
+        index['order'][col] = np.argsort(values.to_numpy(), kind='stable')
+    return index['order'][col]
+
+def query_table(df, index, mask=None, search='', sort_col=None, ascending=True):
+    """يعيد مواضع الصفوف المطابقة للفلتر والبحث بالترتيب المطلوب (بدون نسخ الجدول)."""
+    keep = np.ones(len(df), dtype=bool) if mask is None else np.asarray(mask, dtype=bool)
+    query = normalize_letters(search.strip()).lower()
+    if query:
+        keep = keep & index['search'].str.contains(query, regex=False).to_numpy(dtype=bool)
+    if sort_col is None: return np.flatnonzero(keep)
+    order = sort_order(df, index, sort_col)
+    if not ascending: order = order[::-1]
+    return order[keep[order]]
@@ -0,0 +1,57 @@
+import logging
+import threading
+import data_loader
+
+# ==========================================
+# مراقبة مجلد البيانات وتحديثها في الخلفية
+# ==========================================
+# خيط خلفي يفحص بصمات ملفات المصدر (الحجم + وقت التعديل) كل بضع ثوانٍ،
+# وعند إضافة أو تعديل أو حذف أي ملف يعيد تحميل الملفات المتغيرة فقط (عبر مخزن data_loader)
+# ثم يستبدل قاموس البيانات الحالي بالإصدار الجديد دفعة واحدة.
+# إعادة تشغيل الصفحة تقرأ الإصدار الحالي فقط ولا تتحمل أي تكلفة تحميل.
+
+logger = logging.getLogger(__name__)
+
+def watch_interval():
+    """الفترة بين كل فحص بالثواني (المتغير DASHBOARD_WATCH_INTERVAL، الافتراضي 5)."""
+    return data_loader.env_float('DASHBOARD_WATCH_INTERVAL', 5.0, minimum=0.5)
+
+class DatasetWatcher:
+    def __init__(self, data_dir='.', interval=None, workers=None):
+        self.data_dir = data_dir
+        self.interval = watch_interval() if interval is None else interval
+        self.workers = workers
+        self._dataset = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        # التحميل الأول يتم مباشرة حتى تجد أول جلسة بيانات جاهزة
+        self._dataset = data_loader.build_dataset(self.data_dir, self.workers)
+        self._thread = threading.Thread(target=self._run, name='dataset-watcher', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None: self._thread.join()
+
+    def current(self):
+        """آخر إصدار مكتمل من البيانات (يُستبدل كمرجع واحد فلا تُقرأ بيانات نصف محدثة)."""
+        return self._dataset
+
+    def refresh(self):
+        """يعيد بناء البيانات إذا تغيّرت ملفات المصدر أو كانت ناقصة؛ يعيد True عند تبديل الإصدار.
+        (إصدار البيانات الناقصة لا يطابق dataset_version أبداً فيُعاد تحليل الملف الفاشل في كل فحص)"""
+        if data_loader.dataset_version(self.data_dir) == self._dataset['version']: return False
+        dataset = data_loader.build_dataset(self.data_dir, self.workers)
+        self._dataset = dataset
+        logger.info("dataset %s loaded from %s", dataset['version'], self.data_dir)
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try: self.refresh()
+            except Exception:
+                # ملف تالف أو قيد الكتابة: نحتفظ بالإصدار الحالي ونحاول في الفحص التالي
+                logger.exception("dataset refresh failed for %s", self.data_dir)
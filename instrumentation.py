@@ -0,0 +1,150 @@
+import collections
+import contextlib
+import datetime
+import functools
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+import pandas as pd
+
+# ==========================================
+# قياس زمن المراحل (اختياري)
+# ==========================================
+# عند تفعيل المتغير DASHBOARD_PROFILE تُسجل كل مرحلة (تحميل ملف، بناء رسم، رسم تبويب ...):
+# الزمن، عدد الصفوف، نتيجة المخزن (hit / snapshot / miss) وأقصى ذاكرة (مع DASHBOARD_PROFILE=memory فقط
+# لأن tracemalloc يبطئ التحميل). كل إعادة تشغيل للصفحة تُكتب كسطر JSON واحد في السجل
+# (logger «dashboard.timing»، على stderr إن لم يُعدّ، والملف DASHBOARD_PROFILE_LOG إن حُدد)، وآخر المراحل تبقى في الذاكرة للوحة المشرف.
+# بدون التفعيل لا يُسجل أي شيء وتكلفة stage() مجرد قراءة متغير بيئة.
+
+logger = logging.getLogger('dashboard.timing')
+
+RECENT_STAGES = 200
+_recent = collections.deque(maxlen=RECENT_STAGES)
+_recent_lock = threading.Lock()
+_log_lock = threading.Lock()
+# لكل خيط: المراحل المفتوحة (متداخلة) ومراحل التشغيل الحالي
+_local = threading.local()
+
+def profiling_mode():
+    """'' (معطل) أو 'time' أو 'memory' حسب المتغير DASHBOARD_PROFILE."""
+    value = os.environ.get('DASHBOARD_PROFILE', '').strip().lower()
+    if value in ('', '0', 'false', 'no', 'off'): return ''
+    return 'memory' if value == 'memory' else 'time'
+
+def profiling_enabled():
+    return profiling_mode() != ''
+
+def result_rows(result):
+    """عدد الصفوف في ناتج دالة تحميل (جدول، أو أول عنصر في tuple، أو جداول قاموس البيانات)."""
+    if isinstance(result, pd.DataFrame): return len(result)
+    if isinstance(result, tuple) and result: return result_rows(result[0])
+    if isinstance(result, dict) and 'north' in result:
+        return sum(len(result[k]) for k in ('stations', 'distributors', 'north') if result.get(k) is not None)
+    return None
+
+def _configure_logger():
+    # بدون إعداد مسبق يُهمل مستوى INFO (المستوى الافتراضي WARNING) فلا يصل أي سجل؛
+    # إعدادات السجل الموجودة (مستوى أو معالج) لا تُغيّر
+    if logger.level == logging.NOTSET: logger.setLevel(logging.INFO)
+    if not logger.hasHandlers():
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(asctime)s %(name)s %(message)s'))
+        logger.addHandler(handler)
+
+def _write_log(entry):
+    line = json.dumps(entry, ensure_ascii=False, default=str)
+    with _log_lock: _configure_logger()
+    logger.info(line)
+    path = os.environ.get('DASHBOARD_PROFILE_LOG')
+    if not path: return
+    try:
+        with _log_lock, open(path, 'a', encoding='utf-8') as f: f.write(line + '\n')
+    except OSError: logger.warning("cannot write timing log %s", path)
+
+def _finish(record):
+    with _recent_lock: _recent.append(record)
+    run = getattr(_local, 'run', None)
+    if run is not None: run.append(record)
+    else:
+        # مراحل خارج إعادة تشغيل الصفحة (مثل خيط مراقبة البيانات): تُكتب عند انتهاء المرحلة الخارجية
+        pending = _local.__dict__.setdefault('pending', [])
+        pending.append(record)
+        if record['depth'] == 0:
+            _write_log({'time': record['time'], 'source': record['thread'], 'stages': pending})
+            _local.pending = []
+
+@contextlib.contextmanager
+def stage(name, rows=None, cache=None, **fields):
+    """يقيس كتلة الكود كمرحلة باسم name؛ يعيد قاموس السجل لتحديث rows و cache داخل الكتلة."""
+    mode = profiling_mode()
+    if not mode:
+        yield {}
+        return
+    stack = _local.__dict__.setdefault('stack', [])
+    tracing = mode == 'memory'
+    if tracing:
+        if not tracemalloc.is_tracing(): tracemalloc.start()
+        # أقصى ذاكرة حتى الآن يُحفظ للمرحلة الأب قبل تصفير المؤشر للمرحلة الجديدة
+        if stack: stack[-1]['_peak'] = max(stack[-1]['_peak'], tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+    record = {'stage': name, 'rows': rows, 'cache': cache, 'seconds': None, 'peak_mb': None,
+              'depth': len(stack), 'thread': threading.current_thread().name,
+              'time': datetime.datetime.now().isoformat(timespec='milliseconds'),
+              **fields, '_base': tracemalloc.get_traced_memory()[0] if tracing else 0, '_peak': 0}
+    stack.append(record)
+    start = time.perf_counter()
+    try: yield record
+    finally:
+        record['seconds'] = round(time.perf_counter() - start, 6)
+        stack.pop()
+        base, peak = record.pop('_base'), record.pop('_peak')
+        if tracing and tracemalloc.is_tracing():
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            record['peak_mb'] = round((peak - base) / 2**20, 3)
+            if stack: stack[-1]['_peak'] = max(stack[-1]['_peak'], peak)
+        _finish(record)
+
+def record_stage(name, seconds, rows=None, **fields):
+    """يسجل مرحلة قيست على أجزاء متفرقة (مثل التصنيف دفعة بدفعة) كسجل واحد بمجموع زمنها، داخل المرحلة المفتوحة حالياً."""
+    if not profiling_enabled(): return
+    stack = _local.__dict__.setdefault('stack', [])
+    _finish({'stage': name, 'rows': rows, 'cache': None, 'seconds': round(seconds, 6), 'peak_mb': None,
+             'depth': len(stack), 'thread': threading.current_thread().name,
+             'time': datetime.datetime.now().isoformat(timespec='milliseconds'), **fields})
+
+def annotate(**fields):
+    """يضيف حقولاً (مثل cache) للمرحلة المفتوحة حالياً في هذا الخيط."""
+    stack = getattr(_local, 'stack', None)
+    if stack: stack[-1].update(fields)
+
+def instrumented(name, rows=result_rows):
+    """مزخرف يقيس الدالة كمرحلة؛ عدد الصفوف يُحسب من ناتجها عبر rows."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not profiling_enabled(): return func(*args, **kwargs)
+            with stage(name) as record:
+                result = func(*args, **kwargs)
+                if record.get('rows') is None: record['rows'] = rows(result)
+                return result
+        return wrapper
+    return decorator
+
+def begin_run():
+    """بداية إعادة تشغيل للصفحة: المراحل التالية في هذا الخيط تُجمع في سجل واحد."""
+    _local.run = [] if profiling_enabled() else None
+
+def end_run(**meta):
+    """يكتب سجل إعادة التشغيل (سطر JSON) ويعيد مراحلها."""
+    run, _local.run = getattr(_local, 'run', None), None
+    if run is None: return []
+    _write_log({'time': datetime.datetime.now().isoformat(timespec='milliseconds'), 'source': 'rerun', **meta,
+                'total_seconds': round(sum(r['seconds'] for r in run if r['depth'] == 0), 6), 'stages': run})
+    return run
+
+def recent_stages():
+    """آخر المراحل المسجلة من كل الخيوط (الأحدث أولاً)."""
+    with _recent_lock: return list(reversed(_recent))
@@ -0,0 +1,39 @@
+"""
+بناء الملف الجاهز للوحة مسبقاً (بدون Streamlit)
+
+الاستخدام:
+    python precompute.py --data-dir ./data --output dashboard_artifact.pkl --workers 4
+
+يقرأ كل ملفات Excel في المجلد ويحفظ الجداول بعد التنظيف مع كل التجميعات التي تحتاجها التبويبات،
+وعند وجود هذا الملف (أو المسار في DASHBOARD_ARTIFACT) يقرأه app.py مباشرة بدلاً من تحليل ملفات Excel.
+"""
+import argparse
+import sys
+import time
+import data_loader
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="بناء الملف الجاهز للوحة الكهرباء من ملفات Excel")
+    parser.add_argument('--data-dir', default=data_loader.data_dir(), help="مجلد ملفات Excel (الافتراضي: DASHBOARD_DATA_DIR أو المجلد الحالي)")
+    parser.add_argument('--output', default=data_loader.artifact_path(), help="مسار الملف الناتج")
+    parser.add_argument('--workers', type=int, default=None, help="عدد العمليات لقراءة ملفات الشمال (الافتراضي NORTH_INGEST_WORKERS أو 1)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    dataset = data_loader.build_dataset(args.data_dir, args.workers)
+    if not dataset['complete']:
+        # ملف ناقص يُقرأ بدلاً من Excel إلى أن يُعاد بناؤه، فلا نحفظه
+        print(f"{args.data_dir}: فشل تحليل بعض الملفات، لم يُحفظ {args.output}", file=sys.stderr)
+        return 1
+    data_loader.save_artifact(dataset, args.output)
+
+    rows = {name: (0 if dataset[name] is None else len(dataset[name])) for name in ('stations', 'distributors', 'north')}
+    print(f"{args.output}: version {dataset['version']}, "
+          f"stations={rows['stations']} distributors={rows['distributors']} north={rows['north']} "
+          f"({time.perf_counter() - start:.2f}s)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,49 @@
+import pandas as pd
+import sqlite3
+import threading
+
+# ==========================================
+# استعلامات القطاعات عبر SQLite (في الذاكرة)
+# ==========================================
+# تُحمّل أعمدة التصنيف من الجداول مرة واحدة لكل إصدار بيانات في قاعدة SQLite داخل الذاكرة
+# مع فهارس على (القطاع، الهندسة ...)، فتصبح استعلامات تبويب «تفاصيل القطاعات» بحثاً في الفهرس
+# بدلاً من المرور على كل صفوف الجداول عند كل تغيير للقطاع.
+
+TABLES = {
+    'stations': ['القطاع'],
+    'distributors': ['القطاع', 'الهندسة'],
+    'north': ['القطاع', 'الهندسة', 'الملكية', 'النوع'],
+}
+
+class SectorQueries:
+    def __init__(self, dataset):
+        # اتصال واحد مشترك بين الجلسات؛ القفل يضمن استعلاماً واحداً في كل مرة
+        self._conn = sqlite3.connect(':memory:', check_same_thread=False)
+        self._lock = threading.Lock()
+        for table, cols in TABLES.items():
+            df = dataset[table]
+            if df is None or df.empty: df = pd.DataFrame(columns=cols)
+            df[cols].astype(str).to_sql(table, self._conn, index=False)
+            # الفهرس يغطي كل الأعمدة المستخدمة فلا يُقرأ الجدول نفسه في الاستعلام
+            quoted = ', '.join(f'"{c}"' for c in cols)
+            self._conn.execute(f'CREATE INDEX "idx_{table}" ON "{table}" ({quoted})')
+        self._conn.execute('ANALYZE')
+
+    def _query(self, sql, params):
+        with self._lock: return pd.read_sql_query(sql, self._conn, params=params)
+
+    def station_count(self, sector):
+        return int(self._query('SELECT COUNT(*) AS n FROM stations WHERE "القطاع" = ?', (sector,))['n'].iloc[0])
+
+    def distributors_per_engineering(self, sector):
+        return self._query(
+            'SELECT "الهندسة", COUNT(*) AS "عدد الموزعات" FROM distributors WHERE "القطاع" = ? '
+            'GROUP BY "الهندسة" ORDER BY "الهندسة"', (sector,))
+
+    def transformer_pivot(self, sector):
+        """جدول (الهندسة × الملكية/النوع) بعدد المحولات في القطاع."""
+        counts = self._query(
+            'SELECT "الهندسة", "الملكية", "النوع", COUNT(*) AS "العدد" FROM north WHERE "القطاع" = ? '
+            'GROUP BY "الهندسة", "الملكية", "النوع"', (sector,))
+        if counts.empty: return counts
+        return counts.pivot_table(index='الهندسة', columns=['الملكية', 'النوع'], values='العدد', aggfunc='sum', fill_value=0).astype(int)
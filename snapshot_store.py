@@ -0,0 +1,102 @@
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import hashlib
+import json
+import threading
+import os
+
+# ==========================================
+# مخزن اللقطات (Snapshots) بصيغة Feather
+# ==========================================
+# لكل ملف مصدر (Excel) نحفظ الجداول الناتجة بعد التنظيف في ملفات Feather غير مضغوطة
+# مع ملف manifest.json يحتوي بصمة المصدر (الحجم + وقت التعديل + sha256).
+# عند بدء الخادم تُقرأ اللقطة بـ memory map إذا كانت البصمة مطابقة، وإلا يُعاد تحليل ملف Excel.
+
+MANIFEST_NAME = 'manifest.json'
+# يُرفع عند تغيير محتوى اللقطات المحفوظة؛ اللقطات بإصدار مختلف تُتجاهل ويُعاد تحليل مصدرها
+SNAPSHOT_FORMAT = 3
+_manifest_lock = threading.Lock()
+
+def snapshot_dir(data_dir='.'):
+    """مجلد اللقطات (المتغير DASHBOARD_SNAPSHOT_DIR، الافتراضي .snapshot داخل مجلد البيانات)."""
+    return os.environ.get('DASHBOARD_SNAPSHOT_DIR') or os.path.join(data_dir, '.snapshot')
+
+def content_digest(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''): h.update(chunk)
+    return h.hexdigest()
+
+def _source_key(path):
+    return os.path.abspath(path)
+
+def _frame_file(store, key, name):
+    return os.path.join(store, f"{hashlib.sha1(key.encode('utf-8')).hexdigest()}__{name}.feather")
+
+def _read_manifest(store):
+    try:
+        with open(os.path.join(store, MANIFEST_NAME), encoding='utf-8') as f: return json.load(f)
+    except (OSError, ValueError): return {}
+
+def _write_manifest(store, manifest):
+    tmp = os.path.join(store, MANIFEST_NAME + '.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f: json.dump(manifest, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, os.path.join(store, MANIFEST_NAME))
+
+def _arrow_safe(df):
+    # الأعمدة ذات الأنواع المختلطة (نص + تاريخ مثلاً) لا يقبلها Arrow فتُحفظ كنص
+    out = df
+    for col in df.columns[df.dtypes == object]:
+        try: pa.array(df[col], from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            if out is df: out = df.copy()
+            out[col] = df[col].map(lambda v: v if pd.isna(v) else str(v))
+    return out
+
+def load_snapshot(fingerprint, data_dir='.'):
+    """يعيد جداول المصدر المحفوظة {الاسم: DataFrame} إذا كانت اللقطة صالحة، وإلا None."""
+    path, size, mtime_ns = fingerprint
+    store = snapshot_dir(data_dir)
+    key = _source_key(path)
+    with _manifest_lock:
+        manifest = _read_manifest(store)
+        entry = manifest.get(key)
+        if entry is None or entry.get('format') != SNAPSHOT_FORMAT or entry['size'] != size: return None
+        if entry['mtime_ns'] != mtime_ns:
+            # تغيّر وقت التعديل فقط (نسخ/إعادة نشر): نتحقق من المحتوى نفسه
+            if entry['sha256'] != content_digest(path): return None
+            entry['mtime_ns'] = mtime_ns
+            _write_manifest(store, manifest)
+    try:
+        return {name: feather.read_table(_frame_file(store, key, name), memory_map=True).to_pandas()
+                for name in entry['frames']}
+    except (OSError, pa.ArrowException): return None
+
+def save_snapshot(fingerprint, frames, data_dir='.'):
+    """يحفظ جداول المصدر {الاسم: DataFrame} مع بصمته؛ فشل الحفظ لا يؤثر على تشغيل اللوحة."""
+    path, size, mtime_ns = fingerprint
+    store = snapshot_dir(data_dir)
+    key = _source_key(path)
+    try:
+        os.makedirs(store, exist_ok=True)
+        for name, df in frames.items():
+            feather.write_feather(_arrow_safe(df), _frame_file(store, key, name), compression='uncompressed')
+        with _manifest_lock:
+            manifest = _read_manifest(store)
+            manifest[key] = {'format': SNAPSHOT_FORMAT, 'size': size, 'mtime_ns': mtime_ns, 'sha256': content_digest(path), 'frames': sorted(frames)}
+            _write_manifest(store, manifest)
+    except (OSError, pa.ArrowException): pass
+
+def drop_missing_snapshots(data_dir='.'):
+    """يحذف لقطات الملفات التي لم تعد موجودة على القرص."""
+    store = snapshot_dir(data_dir)
+    with _manifest_lock:
+        manifest = _read_manifest(store)
+        removed = [k for k in manifest if not os.path.exists(k)]
+        if not removed: return
+        for key in removed:
+            for name in manifest.pop(key)['frames']:
+                try: os.remove(_frame_file(store, key, name))
+                except OSError: pass
+        _write_manifest(store, manifest)
@@ -0,0 +1,45 @@
+import os
+import sys
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import data_loader
+
+# ==========================================
+# التصنيف على مستوى الأعمدة = التصنيف الأصلي صفاً بصف
+# ==========================================
+def strict_classify_multi(row, type_cols, col_name):
+    """التصنيف الأصلي (apply لكل صف) كمرجع للمقارنة فقط."""
+    combined_type_text = ""
+    if type_cols:
+        for col in type_cols:
+            val = str(row[col])
+            if pd.notna(val) and val.strip() != 'nan': combined_type_text += val + " "
+    type_clean = combined_type_text.strip().replace('أ', 'ا').replace('ة', 'ه')
+    name_val = str(row[col_name]).strip() if col_name and pd.notna(row[col_name]) else ''
+    name_clean = name_val.replace('أ', 'ا').replace('ة', 'ه')
+    if 'غرف' in type_clean: return 'غرفة'
+    if 'كشك' in type_clean: return 'كشك'
+    if 'هواي' in type_clean or 'علق' in type_clean: return 'هوائي'
+    if 'غرف' in name_clean: return 'غرفة'
+    return 'كشك'
+
+def read_north_sheet(path):
+    rows = data_loader.iter_sheet_rows(path)
+    try:
+        columns = data_loader.read_sheet_header(rows).astype(str).str.strip()
+        return pd.concat(data_loader.iter_sheet_chunks(rows, columns), ignore_index=True)
+    finally: rows.close()
+
+@pytest.mark.parametrize('filename', data_loader.list_north_files(ROOT))
+def test_classifier_matches_row_wise_reference(filename):
+    df = read_north_sheet(os.path.join(ROOT, filename))
+    col_name, type_cols, _ = data_loader.transformer_columns(df.columns)
+    df = df.dropna(subset=[col_name])
+    assert len(df) > 0
+    expected = df.apply(lambda row: strict_classify_multi(row, type_cols, col_name), axis=1)
+    actual = data_loader.classify_transformer_types(df, type_cols, col_name)
+    pd.testing.assert_series_equal(actual, expected, check_dtype=False, check_names=False)
@@ -0,0 +1,22 @@
+import os
+import sys
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import data_loader
+
+# ==========================================
+# التحميل من اللقطات = التحميل البارد من ملفات Excel
+# ==========================================
+def test_snapshot_reload_matches_cold_load(tmp_path, monkeypatch):
+    monkeypatch.setenv('DASHBOARD_SNAPSHOT_DIR', str(tmp_path))
+    data_loader.clear_caches()
+    cold = data_loader.build_dataset(ROOT, 1)
+    data_loader.clear_caches()
+    reloaded = data_loader.build_dataset(ROOT, 1)
+    data_loader.clear_caches()
+    assert reloaded['version'] == cold['version']
+    for name in ('stations', 'distributors', 'distributors_summary', 'north'):
+        pd.testing.assert_frame_equal(reloaded[name], cold[name])